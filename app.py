@@ -1,11 +1,229 @@
-from flask import Flask, render_template, request, jsonify
-from beam_solver import BeamSolver
-from pillar_solver import PillarSolver
-from frame_solver import FrameSolver
+from flask import Flask, render_template, request, jsonify, g, abort
+from solver_cache import LRUCache
+from result_cache import ResultCache
+from columnar import MEDIA_TYPE as COLUMNAR_TYPE, DTYPES, pack
+from jobs import JobManager, JobQueueFull
+from sessions import SessionStore
+from live import LiveHub, ChannelLimit, StaleCommand
+from metrics import MetricsRegistry, DeadlineExceeded, set_deadline, timed, server_timing
+import tasks
+import gzip
 import logging
+import os
+import random
+import reprlib
+import time
 
 app = Flask(__name__)
-logging.basicConfig(level=logging.DEBUG)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'DEBUG').upper())
+
+# Request bodies larger than this are refused (413)
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_REQUEST_BYTES', 64 * 1024 * 1024))
+
+# Assembled stiffness matrices and factorizations, keyed by structure (geometry,
+# sections, supports). Interactive edits that only change load magnitudes hit it.
+# Bounded by entries and by the estimated memory of the matrices and factors.
+factor_cache = LRUCache(
+    maxsize=int(os.environ.get('FACTOR_CACHE_SIZE', 32)),
+    ttl=float(os.environ.get('FACTOR_CACHE_TTL', 600)),
+    max_bytes=int(os.environ.get('FACTOR_CACHE_BYTES', 512 * 1024 * 1024))
+)
+
+# Finished results keyed by the canonical request, for repeated identical
+# /calculate, /calculate_pillar and /calculate_frame requests (see result_cache.py).
+# RESULT_CACHE_DIR adds a disk tier shared by every process that uses it.
+result_cache = ResultCache(
+    max_bytes=int(os.environ.get('RESULT_CACHE_BYTES', 64 * 1024 * 1024)),
+    directory=os.environ.get('RESULT_CACHE_DIR') or None,
+    disk_max_bytes=int(os.environ.get('RESULT_CACHE_DISK_BYTES', 1024 ** 3)),
+    digits=int(os.environ.get('RESULT_CACHE_DIGITS', 12))
+)
+
+# Background solves in worker processes; small jobs still run inline
+job_manager = JobManager(
+    max_workers=int(os.environ.get('JOB_WORKERS', 2)),
+    max_queue=int(os.environ.get('JOB_QUEUE_DEPTH', 64)),
+    timeout=float(os.environ.get('JOB_TIMEOUT', 300)),
+    sync_limit=int(os.environ.get('JOB_SYNC_LIMIT', 3000))
+)
+
+# Editable frame models; patches re-solve with the session's factorization
+session_store = SessionStore(
+    maxsize=int(os.environ.get('SESSION_LIMIT', 64)),
+    ttl=float(os.environ.get('SESSION_TTL', 1800)),
+    max_rank=int(os.environ.get('SESSION_MAX_RANK', 64))
+)
+
+# Live recalculation streams of the editor tabs (see live.py)
+live_hub = LiveHub(job_manager, cache=factor_cache, results=result_cache,
+                   max_channels=int(os.environ.get('LIVE_CHANNEL_LIMIT', 256)))
+
+# Request counts, latencies, per-phase solver timings and model sizes for /metrics
+metrics = MetricsRegistry()
+
+# Seconds a request may spend solving before it is answered with 503 (0 disables).
+# Checked between solver phases, so a phase that has started finishes first.
+# The /live stream is exempt: its solves are small or run as background jobs.
+SOLVE_TIME_LIMIT = float(os.environ.get('SOLVE_TIME_LIMIT', 60))
+
+# Responses larger than this are gzipped for clients that accept it
+GZIP_MIN_SIZE = int(os.environ.get('GZIP_MIN_SIZE', 1024))
+
+# Fraction of requests whose payload is logged, and the logged length limit
+LOG_PAYLOAD_SAMPLE = float(os.environ.get('LOG_PAYLOAD_SAMPLE', 0.01))
+LOG_PAYLOAD_MAX = int(os.environ.get('LOG_PAYLOAD_MAX', 1000))
+_payload_repr = reprlib.Repr()
+_payload_repr.maxlist = _payload_repr.maxdict = 20
+_payload_repr.maxlevel = 4
+
+def log_request(label, data):
+    # Formatting a large model is expensive, so payloads are sampled and abbreviated
+    app.logger.info(f"Received {label} request")
+    if random.random() < LOG_PAYLOAD_SAMPLE:
+        app.logger.info(f"{label} payload (sampled): {_payload_repr.repr(data)[:LOG_PAYLOAD_MAX]}")
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.before_request
+def limit_request_size():
+    # Refuse oversized bodies up front, before anything reads them
+    limit = app.config['MAX_CONTENT_LENGTH']
+    if limit is not None and request.content_length is not None and request.content_length > limit:
+        abort(413)
+
+@app.before_request
+def start_deadline():
+    set_deadline(SOLVE_TIME_LIMIT if request.endpoint != 'open_live' else None)
+
+@app.teardown_request
+def clear_deadline(exc):
+    set_deadline(None)
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({'status': 'error',
+                    'message': f"Request body exceeds {app.config['MAX_CONTENT_LENGTH']} bytes"}), 413
+
+@app.after_request
+def record_request(response):
+    endpoint = request.endpoint or 'unknown'
+    metrics.inc('http_requests_total', 'HTTP requests by endpoint and status.',
+                endpoint=endpoint, status=response.status_code)
+    if 'request_start' in g:
+        metrics.observe('http_request_duration_seconds', 'HTTP request latency.',
+                        time.perf_counter() - g.request_start, endpoint=endpoint)
+    return response
+
+def time_limit_exceeded(e):
+    metrics.inc('solve_timeouts_total', 'Requests stopped by the solve time limit.', endpoint=request.endpoint)
+    app.logger.warning(f"{request.endpoint}: {e}")
+    return jsonify({'status': 'error', 'message': str(e)}), 503
+
+def response_format():
+    # ('columnar', precision) for clients that list application/x-columnar in Accept
+    # at least as high as JSON, else ('json', None)
+    accept = request.accept_mimetypes
+    if COLUMNAR_TYPE in accept.values() and accept[COLUMNAR_TYPE] >= accept['application/json']:
+        precision = request.args.get('precision', 'float64')
+        if precision not in DTYPES:
+            raise ValueError(f"Unsupported precision: {precision}")
+        return 'columnar', precision
+    return 'json', None
+
+def respond(result, stats=None):
+    # Successful solver response. JSON by default; clients that list
+    # application/x-columnar in Accept get the binary format from columnar.pack
+    # (?precision=float32 halves the float columns). Both are gzipped when allowed.
+    # stats: {'timings', 'sizes'} from tasks.*, reported in Server-Timing and /metrics
+    stats = stats if stats is not None else {}
+    timings = stats.setdefault('timings', {})
+    body = {'status': 'success', 'data': result}
+    
+    with timed(timings, 'encode', deadline=False):
+        fmt, precision = response_format()
+        if fmt == 'columnar':
+            response = app.response_class(pack(body, dtype=precision), mimetype=COLUMNAR_TYPE)
+        else:
+            response = jsonify(body)
+        response.vary.add('Accept')
+        response.vary.add('Accept-Encoding')
+        if 'gzip' in request.accept_encodings and response.content_length and response.content_length >= GZIP_MIN_SIZE:
+            response.set_data(gzip.compress(response.get_data(), compresslevel=5))
+            response.headers['Content-Encoding'] = 'gzip'
+    
+    endpoint = request.endpoint
+    for phase, seconds in timings.items():
+        metrics.observe('solver_phase_seconds', 'Time spent per request phase.', seconds,
+                        endpoint=endpoint, phase=phase)
+    for quantity, value in stats.get('sizes', {}).items():
+        metrics.set('solver_model_size', 'Model size of the last solved request.', value,
+                    endpoint=endpoint, quantity=quantity)
+    timings['total'] = time.perf_counter() - g.request_start
+    response.headers['Server-Timing'] = server_timing(timings)
+    return response
+
+def cached_response(kind, data, solve, stats):
+    # respond() with the result of solve(), or of an identical earlier request. The
+    # weak ETag names the canonical request and the response format, so a client
+    # that still holds that result gets a 304 without any lookup. (HTTP defines 304
+    # for conditional GETs; for these POSTs it is an agreement with the page.)
+    # A request with Cache-Control: no-cache is always solved (benchmarks, load tests).
+    if request.cache_control.no_cache:
+        return respond(solve(), stats)
+    key = result_cache.key(kind, data)
+    etag = '-'.join(part for part in (key, *response_format()) if part)
+    if not request.if_none_match.star_tag and request.if_none_match.contains_weak(etag):
+        result_cache.count_not_modified()
+        response = app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        response.vary.add('Accept')
+        return response
+    
+    with timed(stats['timings'], 'cache', deadline=False):
+        result = result_cache.get(key)
+    if result is None:
+        result = solve()
+        with timed(stats['timings'], 'cache', deadline=False):
+            result_cache.put(key, result)
+    response = respond(result, stats)
+    response.set_etag(etag, weak=True)
+    return response
+
+def collect_service_stats():
+    # Factorization cache and job queue state, read when /metrics is scraped
+    cache = factor_cache.stats()
+    jobs = job_manager.stats()
+    live = live_hub.stats()
+    results = result_cache.stats()
+    return [
+        ('factor_cache_entries', 'gauge', 'Entries in the factorization cache.', [({}, cache['size'])]),
+        ('factor_cache_bytes', 'gauge', 'Estimated memory held by the factorization cache.', [({}, cache['bytes'])]),
+        ('factor_cache_lookups_total', 'counter', 'Factorization cache lookups.',
+         [({'result': 'hit'}, cache['hits']), ({'result': 'miss'}, cache['misses'])]),
+        ('factor_cache_evictions_total', 'counter', 'Factorization cache evictions.',
+         [({'reason': 'size'}, cache['evictions']), ({'reason': 'ttl'}, cache['expirations'])]),
+        ('result_cache_entries', 'gauge', 'Results in the memory tier of the result cache.', [({}, results['size'])]),
+        ('result_cache_bytes', 'gauge', 'Memory held by the result cache.', [({}, results['bytes'])]),
+        ('result_cache_lookups_total', 'counter', 'Result cache lookups.',
+         [({'result': 'hit'}, results['hits']), ({'result': 'disk_hit'}, results['disk_hits']),
+          ({'result': 'miss'}, results['misses'])]),
+        ('result_cache_evictions_total', 'counter', 'Results evicted from the memory tier.', [({}, results['evictions'])]),
+        ('result_cache_not_modified_total', 'counter', 'Conditional requests answered with 304.',
+         [({}, results['not_modified'])]),
+        ('jobs_queued', 'gauge', 'Background jobs waiting for a worker.', [({}, jobs['queued'])]),
+        ('jobs_busy_workers', 'gauge', 'Worker processes running a job.', [({}, jobs['busy_workers'])]),
+        ('jobs', 'gauge', 'Retained jobs by state.', [({'state': k}, v) for k, v in sorted(jobs['jobs'].items())]),
+        ('live_channels', 'gauge', 'Open live recalculation streams.', [({}, live['channels'])]),
+        ('live_commands_total', 'counter', 'Live commands received, and those superseded before or while solving.',
+         [({'outcome': 'received'}, live['commands']), ({'outcome': 'replaced'}, live['replaced']),
+          ({'outcome': 'cancelled'}, live['cancelled'])]),
+        ('live_results_total', 'counter', 'Live result events sent.',
+         [({'status': 'success'}, live['results'] - live['errors']), ({'status': 'error'}, live['errors'])])
+    ]
+
+metrics.add_collector(collect_service_stats)
 
 @app.route('/')
 def index():
@@ -14,31 +232,16 @@ def index():
 @app.route('/calculate', methods=['POST'])
 def calculate():
     try:
-        data = request.json
-        app.logger.info(f"Received calculation request: {data}")
-        
-        length = float(data.get('length', 10))
-        E = float(data.get('E', 200e9)) # 200 GPa default
-        I = float(data.get('I', 0.0001)) # Default I
-        
-        solver = BeamSolver(length, E, I)
-        
-        supports = data.get('supports', [])
-        for s in supports:
-            solver.add_support(s['pos'], s['type'])
-            
-        loads = data.get('loads', [])
-        for l in loads:
-            solver.add_load(l['pos'], l['magnitude'])
-
-        dist_loads = data.get('dist_loads', [])
-        for dl in dist_loads:
-            solver.add_dist_load(dl['start'], dl['end'], dl['magnitude'])
-            
-        result = solver.solve()
+        stats = {'timings': {}}
+        with timed(stats['timings'], 'parse'):
+            data = request.json
+        log_request("calculation", data)
         
-        return jsonify({'status': 'success', 'data': result})
+        return cached_response('beam', data,
+                               lambda: tasks.solve_beam(data, cache=factor_cache, stats=stats), stats)
         
+    except DeadlineExceeded as e:
+        return time_limit_exceeded(e)
     except Exception as e:
         app.logger.error(f"Error in calculation: {e}", exc_info=True)
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -46,50 +249,327 @@ def calculate():
 @app.route('/calculate_pillar', methods=['POST'])
 def calculate_pillar():
     try:
-        data = request.json
-        app.logger.info(f"Received pillar request: {data}")
-        
-        solver = PillarSolver(
-            length=data.get('length'),
-            E=data.get('E'),
-            I=data.get('I'),
-            A=data.get('A'),
-            k_factor_type=data.get('k_type')
-        )
+        stats = {'timings': {}}
+        with timed(stats['timings'], 'parse'):
+            data = request.json
+        log_request("pillar", data)
         
-        result = solver.solve()
-        return jsonify({'status': 'success', 'data': result})
+        def solve():
+            with timed(stats['timings'], 'solve'):
+                return tasks.solve_pillar(data)
+        return cached_response('pillar', data, solve, stats)
         
+    except DeadlineExceeded as e:
+        return time_limit_exceeded(e)
     except Exception as e:
         app.logger.error(f"Error in pillar calculation: {e}", exc_info=True)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/calculate_pillar_sweep', methods=['POST'])
+def calculate_pillar_sweep():
+    # Design-chart grid: any of length/E/I/A may be a list or {start, stop, num, log},
+    # k_type may be a list; dtype is 'float64' (default) or 'float32'
+    try:
+        stats = {'timings': {}}
+        with timed(stats['timings'], 'parse'):
+            data = request.json
+        app.logger.info("Received pillar sweep request")
+        
+        with timed(stats['timings'], 'solve'):
+            result = tasks.solve_pillar_sweep(data)
+        return respond(result, stats)
+        
+    except DeadlineExceeded as e:
+        return time_limit_exceeded(e)
+    except Exception as e:
+        app.logger.error(f"Error in pillar sweep: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/calculate_frame', methods=['POST'])
 def calculate_frame():
     try:
-        data = request.json
-        app.logger.info(f"Received frame request: {data}")
-        
-        solver = FrameSolver()
-        
-        for node in data.get('nodes', []):
-            solver.add_node(node['id'], node['x'], node['y'])
-            
-        for elem in data.get('elements', []):
-            solver.add_element(elem['id'], elem['n1'], elem['n2'], elem['E'], elem['A'], elem['I'])
-            
-        for supp in data.get('supports', []):
-            solver.add_support(supp['node'], supp['type'])
-            
-        for load in data.get('loads', []):
-            solver.add_load(load['node'], load['fx'], load['fy'], load['m'])
-            
-        result = solver.solve()
-        return jsonify({'status': 'success', 'data': result})
+        stats = {'timings': {}}
+        with timed(stats['timings'], 'parse'):
+            data = request.json
+        log_request("frame", data)
         
+        return cached_response('frame', data,
+                               lambda: tasks.solve_frame(data, cache=factor_cache, stats=stats), stats)
+        
+    except DeadlineExceeded as e:
+        return time_limit_exceeded(e)
     except Exception as e:
         app.logger.error(f"Error in frame calculation: {e}", exc_info=True)
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/calculate_batch', methods=['POST'])
+def calculate_batch():
+    # One beam, many load cases: {..beam.., load_cases: [{name, loads, dist_loads}],
+    # combinations: [{name, factors: {case: factor}}]}
+    try:
+        stats = {'timings': {}}
+        with timed(stats['timings'], 'parse'):
+            data = request.json
+        app.logger.info(f"Received batch request with {len(data.get('load_cases', []))} load cases")
+        
+        result = tasks.solve_beam_batch(data, cache=factor_cache, stats=stats)
+        return respond(result, stats)
+        
+    except DeadlineExceeded as e:
+        return time_limit_exceeded(e)
+    except Exception as e:
+        app.logger.error(f"Error in batch calculation: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/calculate_frame_batch', methods=['POST'])
+def calculate_frame_batch():
+    # One frame, many load cases: {..frame.., load_cases: [{name, loads}], combinations: [...]}
+    try:
+        stats = {'timings': {}}
+        with timed(stats['timings'], 'parse'):
+            data = request.json
+        app.logger.info(f"Received frame batch request with {len(data.get('load_cases', []))} load cases")
+        
+        result = tasks.solve_frame_batch(data, cache=factor_cache, stats=stats)
+        return respond(result, stats)
+        
+    except DeadlineExceeded as e:
+        return time_limit_exceeded(e)
+    except Exception as e:
+        app.logger.error(f"Error in frame batch calculation: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/calculate_modal', methods=['POST'])
+def calculate_modal():
+    # Natural frequencies: {..frame.., num_modes, mass: 'consistent' | 'lumped',
+    # rho (kg/m^3, members may give their own mass per length 'm'), max_nodes}
+    try:
+        stats = {'timings': {}}
+        with timed(stats['timings'], 'parse'):
+            data = request.json
+        log_request("modal", data)
+        
+        result = tasks.solve_modal(data, cache=factor_cache, stats=stats)
+        return respond(result, stats)
+        
+    except DeadlineExceeded as e:
+        return time_limit_exceeded(e)
+    except Exception as e:
+        app.logger.error(f"Error in modal analysis: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/calculate_buckling', methods=['POST'])
+def calculate_buckling():
+    # Linear buckling with the frame's loads as reference loads: {..frame.., num_modes, max_nodes}
+    try:
+        stats = {'timings': {}}
+        with timed(stats['timings'], 'parse'):
+            data = request.json
+        log_request("buckling", data)
+        
+        result = tasks.solve_buckling(data, cache=factor_cache, stats=stats)
+        return respond(result, stats)
+        
+    except DeadlineExceeded as e:
+        return time_limit_exceeded(e)
+    except Exception as e:
+        app.logger.error(f"Error in buckling analysis: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/calculate_p_delta', methods=['POST'])
+def calculate_p_delta():
+    # Second-order analysis: {..frame.., tol, max_iter, member_points}
+    try:
+        stats = {'timings': {}}
+        with timed(stats['timings'], 'parse'):
+            data = request.json
+        log_request("P-Delta", data)
+        
+        result = tasks.solve_p_delta(data, cache=factor_cache, stats=stats)
+        return respond(result, stats)
+        
+    except DeadlineExceeded as e:
+        return time_limit_exceeded(e)
+    except Exception as e:
+        app.logger.error(f"Error in P-Delta analysis: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/calculate_influence', methods=['POST'])
+def calculate_influence():
+    # Moving load train on a beam: {..beam.., axles: [{offset, magnitude}],
+    # num_positions, num_sections}
+    try:
+        stats = {'timings': {}}
+        with timed(stats['timings'], 'parse'):
+            data = request.json
+        app.logger.info(f"Received influence request with {len(data.get('axles', []))} axles")
+        
+        result = tasks.solve_influence(data, cache=factor_cache, stats=stats)
+        return respond(result, stats)
+        
+    except DeadlineExceeded as e:
+        return time_limit_exceeded(e)
+    except Exception as e:
+        app.logger.error(f"Error in influence calculation: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+def session_response(session, result, info, stats):
+    stats['timings'].update(info.pop('timings'))
+    data = {'id': session.id, 'version': session.version, **info, 'result': result}
+    return respond(data, stats)
+
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    # Body: a /calculate_frame payload. Returns the session id and the first solve.
+    try:
+        stats = {'timings': {}}
+        with timed(stats['timings'], 'parse'):
+            data = request.json
+        log_request("session", data)
+        
+        session, result, info = session_store.create(data)
+        response = session_response(session, result, info, stats)
+        response.status_code = 201
+        return response
+        
+    except DeadlineExceeded as e:
+        return time_limit_exceeded(e)
+    except Exception as e:
+        app.logger.error(f"Error creating session: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/sessions/<session_id>', methods=['PATCH'])
+def patch_session(session_id):
+    # Body: {ops: [...]} (see sessions.py). Returns the re-solved model and how
+    # the factorization was obtained: update = 'loads' | 'low_rank' | 'full'.
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify({'status': 'error', 'message': 'Unknown session'}), 404
+    try:
+        stats = {'timings': {}}
+        with timed(stats['timings'], 'parse'):
+            data = request.json
+        app.logger.info(f"Received session patch with {len(data.get('ops', []))} ops")
+        
+        result, info = session_store.patch(session, data.get('ops', []))
+        return session_response(session, result, info, stats)
+        
+    except DeadlineExceeded as e:
+        return time_limit_exceeded(e)
+    except Exception as e:
+        app.logger.error(f"Error patching session: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    session = session_store.get(session_id)
+    if session is None:
+        return jsonify({'status': 'error', 'message': 'Unknown session'}), 404
+    return jsonify({'status': 'success', 'data': session.describe()})
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    if session_store.delete(session_id) is None:
+        return jsonify({'status': 'error', 'message': 'Unknown session'}), 404
+    return jsonify({'status': 'success'})
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    # {kind: 'beam' | 'beam_batch' | 'influence' | 'pillar' | 'pillar_sweep' | 'frame' | 'frame_batch' | 'modal' | 'buckling' | 'p_delta',
+    #  payload: <same body as the matching /calculate* endpoint>}
+    try:
+        data = request.json
+        kind = data.get('kind')
+        app.logger.info(f"Received job submission: {kind}")
+        
+        job = job_manager.submit(kind, data.get('payload', {}), cache=factor_cache)
+        body = {'status': 'success', 'data': JobManager.describe(job)}
+        if job['state'] == 'done':
+            # Small job, solved inline
+            body['data']['result'] = job['result']
+        return jsonify(body), 200 if job['mode'] == 'sync' else 202
+        
+    except JobQueueFull as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
+    except Exception as e:
+        app.logger.error(f"Error submitting job: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Unknown job'}), 404
+    return jsonify({'status': 'success', 'data': JobManager.describe(job)})
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Unknown job'}), 404
+    if job['state'] == 'done':
+        return jsonify({'status': 'success', 'data': job['result']})
+    if job['state'] in ('queued', 'running'):
+        return jsonify({'status': 'pending', 'state': job['state']}), 202
+    code = 410 if job['state'] == 'cancelled' else 500
+    return jsonify({'status': 'error', 'state': job['state'], 'message': job['error']}), code
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Unknown job'}), 404
+    return jsonify({'status': 'success', 'data': JobManager.describe(job)})
+
+@app.route('/jobs', methods=['GET'])
+def job_stats():
+    return jsonify({'status': 'success', 'data': job_manager.stats()})
+
+@app.route('/live', methods=['GET'])
+def open_live():
+    # Server-Sent Events stream; its first event names the channel that
+    # POST /live/<channel> commands go to (see live.py)
+    try:
+        channel = live_hub.open()
+    except ChannelLimit as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
+    app.logger.info(f"Opened live channel {channel.id}")
+    response = app.response_class(live_hub.stream(channel), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # proxies must not buffer the stream
+    return response
+
+@app.route('/live/<channel_id>', methods=['POST'])
+def post_live(channel_id):
+    # Body: {kind: 'beam' | 'pillar' | 'frame', seq, payload}. The result arrives
+    # on the channel's stream; an older command of the same kind is dropped.
+    channel = live_hub.get(channel_id)
+    if channel is None:
+        return jsonify({'status': 'error', 'message': 'Unknown live channel'}), 404
+    try:
+        data = request.json
+        replaced = live_hub.post(channel, data.get('kind'), data.get('seq'), data.get('payload', {}))
+        return jsonify({'status': 'success',
+                        'data': {'kind': data['kind'], 'seq': data['seq'], 'replaced': replaced}}), 202
+        
+    except StaleCommand as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 409
+    except Exception as e:
+        app.logger.error(f"Error in live command: {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    # Prometheus text exposition format
+    return app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify({'status': 'success', 'data': {'factorization': factor_cache.stats(),
+                                                  'results': result_cache.stats(),
+                                                  'sessions': session_store.stats(),
+                                                  'live': live_hub.stats()}})
+
 if __name__ == '__main__':
+    # Development server; production runs under gunicorn (see gunicorn.conf.py)
     app.run(debug=True, port=5001)
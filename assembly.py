@@ -0,0 +1,146 @@
+import numpy as np
+import scipy.sparse as sp
+
+# Batched element matrices and global scatter shared by the beam and frame
+# solvers. Element quantities are stacked along the first axis, so a model with
+# n elements is assembled with a handful of array operations instead of a
+# Python loop per element.
+
+
+def beam_stiffness(le, EI):
+    # Euler-Bernoulli beam elements, DOFs (v1, th1, v2, th2): (n, 4, 4)
+    le = np.asarray(le, dtype=float)
+    one = np.ones_like(le)
+    k_e = np.empty((len(le), 4, 4))
+    k_e[:, 0, :] = np.stack([12*one, 6*le, -12*one, 6*le], axis=1)
+    k_e[:, 1, :] = np.stack([6*le, 4*le**2, -6*le, 2*le**2], axis=1)
+    k_e[:, 2, :] = np.stack([-12*one, -6*le, 12*one, -6*le], axis=1)
+    k_e[:, 3, :] = np.stack([6*le, 2*le**2, -6*le, 4*le**2], axis=1)
+    k_e *= (EI / le**3)[:, None, None]
+    return k_e
+
+
+def frame_geometry(x1, y1, x2, y2):
+    # Lengths and direction cosines of 2D members
+    dx = np.asarray(x2, dtype=float) - x1
+    dy = np.asarray(y2, dtype=float) - y1
+    L = np.hypot(dx, dy)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return L, dx / L, dy / L
+
+
+def frame_local_stiffness(L, E, A, I):
+    # 2D frame elements in local axes, DOFs (u1, v1, th1, u2, v2, th2): (n, 6, 6)
+    EA_L = E * A / L
+    k1 = 12 * E * I / L**3
+    k2 = 6 * E * I / L**2
+    k3 = 4 * E * I / L
+    k4 = 2 * E * I / L
+    k = np.zeros((len(L), 6, 6))
+    k[:, 0, 0] = k[:, 3, 3] = EA_L
+    k[:, 0, 3] = k[:, 3, 0] = -EA_L
+    k[:, 1, 1] = k[:, 4, 4] = k1
+    k[:, 1, 4] = k[:, 4, 1] = -k1
+    k[:, 1, 2] = k[:, 2, 1] = k2
+    k[:, 1, 5] = k[:, 5, 1] = k2
+    k[:, 4, 2] = k[:, 2, 4] = -k2
+    k[:, 4, 5] = k[:, 5, 4] = -k2
+    k[:, 2, 2] = k[:, 5, 5] = k3
+    k[:, 2, 5] = k[:, 5, 2] = k4
+    return k
+
+
+def frame_rotation(c, s):
+    # Global -> local transformation per element: (n, 6, 6)
+    #   [ c  s  0]
+    #   [-s  c  0]   on each node's (u, v, theta) block
+    #   [ 0  0  1]
+    T = np.zeros((len(c), 6, 6))
+    for o in (0, 3):
+        T[:, o, o] = T[:, o + 1, o + 1] = c
+        T[:, o, o + 1] = s
+        T[:, o + 1, o] = -s
+        T[:, o + 2, o + 2] = 1
+    return T
+
+
+def to_global(k_local, T):
+    # T^T k T for every element
+    return np.einsum('nji,njk,nkl->nil', T, k_local, T, optimize=True)
+
+
+def element_dofs(n1, n2, dofs_per_node):
+    # Global DOF numbers of two-node elements: (n, 2 * dofs_per_node)
+    offsets = np.arange(dofs_per_node)
+    return np.concatenate([dofs_per_node * np.asarray(n1)[:, None] + offsets,
+                           dofs_per_node * np.asarray(n2)[:, None] + offsets], axis=1)
+
+
+def scatter(k_e, dofs, num_dof, sparse):
+    # Sums the element blocks into the global matrix in one pass: CSR (duplicates
+    # summed by scipy) or dense (np.bincount over flattened indices)
+    m = dofs.shape[1]
+    rows = np.repeat(dofs, m, axis=1).ravel()
+    cols = np.tile(dofs, (1, m)).ravel()
+    vals = k_e.ravel()
+    if sparse:
+        return sp.coo_matrix((vals, (rows, cols)), shape=(num_dof, num_dof)).tocsr()
+    flat = np.bincount(rows * num_dof + cols, weights=vals, minlength=num_dof * num_dof)
+    return flat.reshape(num_dof, num_dof)
+
+
+def scatter_banded(k_e, first_dof, num_dof, bandwidth):
+    # Upper band of the global matrix, LAPACK style: K[r, c] lives in
+    # K_band[bandwidth + r - c, c]. Element i owns DOFs first_dof[i]..first_dof[i]+m-1;
+    # first_dof must not repeat (true for a chain of elements).
+    m = k_e.shape[1]
+    K_band = np.zeros((bandwidth + 1, num_dof))
+    for r in range(m):
+        for c in range(r, m):
+            # Column first_dof + c is distinct for every element, so no index repeats
+            K_band[bandwidth + r - c, first_dof + c] += k_e[:, r, c]
+    return K_band
+
+
+def frame_local_mass(L, m, lumped=False):
+    # 2D frame element mass in local axes (m: mass per unit length): (n, 6, 6).
+    # Consistent: linear axial and cubic Hermite transverse shape functions.
+    # Lumped: half the member mass on each node's translations, plus HRZ rotary
+    # inertia m L^3 / 78 so the mass matrix stays positive definite.
+    L = np.asarray(L, dtype=float)
+    mL = m * L
+    M = np.zeros((len(L), 6, 6))
+    if lumped:
+        for i in (0, 1, 3, 4):
+            M[:, i, i] = mL / 2
+        M[:, 2, 2] = M[:, 5, 5] = mL * L**2 / 78
+        return M
+    M[:, 0, 0] = M[:, 3, 3] = mL / 3
+    M[:, 0, 3] = M[:, 3, 0] = mL / 6
+    c = (mL / 420)[:, None, None]
+    one = np.ones_like(L)
+    bending = np.stack([
+        np.stack([156*one, 22*L, 54*one, -13*L], axis=1),
+        np.stack([22*L, 4*L**2, 13*L, -3*L**2], axis=1),
+        np.stack([54*one, 13*L, 156*one, -22*L], axis=1),
+        np.stack([-13*L, -3*L**2, -22*L, 4*L**2], axis=1)
+    ], axis=1)
+    M[np.ix_(np.arange(len(L)), [1, 2, 4, 5], [1, 2, 4, 5])] = c * bending
+    return M
+
+
+def frame_local_geometric(L, N):
+    # Geometric stiffness of 2D frame elements in local axes for axial force N
+    # (tension positive), cubic transverse shape functions: (n, 6, 6)
+    L = np.asarray(L, dtype=float)
+    c = (N / (30 * L))[:, None, None]
+    one = np.ones_like(L)
+    bending = np.stack([
+        np.stack([36*one, 3*L, -36*one, 3*L], axis=1),
+        np.stack([3*L, 4*L**2, -3*L, -L**2], axis=1),
+        np.stack([-36*one, -3*L, 36*one, -3*L], axis=1),
+        np.stack([3*L, -L**2, -3*L, 4*L**2], axis=1)
+    ], axis=1)
+    Kg = np.zeros((len(L), 6, 6))
+    Kg[np.ix_(np.arange(len(L)), [1, 2, 4, 5], [1, 2, 4, 5])] = c * bending
+    return Kg
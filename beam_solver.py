@@ -1,242 +1,724 @@
 import numpy as np
+from scipy.linalg import cholesky_banded, cho_solve_banded
+from scipy.linalg.lapack import dgbtrf, dgbtrs
+from load_cases import parse_cases, combination_matrix, min_max
+from solver_cache import structure_key
+from metrics import timed
+from assembly import beam_stiffness, scatter_banded
+from model_arrays import ColumnTable, columns
+
+# Half-bandwidth of the beam stiffness matrix (2 DOFs per node, 2 nodes per element)
+BANDWIDTH = 3
+
+# Load positions closer together than this fraction of the mean element length
+# share a node (see BeamSolver._discretize): a near-zero element makes the
+# stiffness matrix too ill-conditioned to solve
+NODE_MERGE_TOLERANCE = 1e-3
+
+# Largest relative residual max|K x - b| / max|b| accepted from a solve
+RESIDUAL_TOLERANCE = 1e-6
+
+# Model storage: one array per field (see model_arrays.ColumnTable)
+SUPPORT_FIELDS = {'pos': float, 'type': object}
+LOAD_FIELDS = {'pos': float, 'magnitude': float}
+DIST_LOAD_FIELDS = {'start': float, 'end': float, 'magnitude': float}
+
+
+def _banded_submatrix(K_band, keep):
+    # Upper band storage of K[keep][:, keep] for sorted DOF indices `keep`.
+    # Dropping rows/columns never widens the band, so the result has the same layout.
+    u = K_band.shape[0] - 1
+    sub = np.zeros((u + 1, len(keep)))
+    for k in range(u + 1):
+        if len(keep) <= k:
+            break
+        gap = keep[k:] - keep[:len(keep) - k]
+        inside = gap <= u
+        cols = keep[k:][inside]
+        sub[u - k, k:][inside] = K_band[u - gap[inside], cols]
+    return sub
+
+
+def _banded_matvec(K_band, x):
+    # y = K x for a symmetric matrix in upper band storage
+    # x may hold several vectors as columns
+    u = K_band.shape[0] - 1
+    band = K_band.reshape(K_band.shape + (1,) * (x.ndim - 1))
+    y = band[u] * x
+    for k in range(1, u + 1):
+        y[:-k] += band[u - k, k:] * x[k:]
+        y[k:] += band[u - k, k:] * x[:-k]
+    return y
+
+
+def _factorize_banded_lu(K_band):
+    # Banded LU factorization of the same matrix (LAPACK gbtrf); returns a solve function
+    u = K_band.shape[0] - 1
+    n = K_band.shape[1]
+    ab = np.zeros((3 * u + 1, n))
+    ab[u:2 * u + 1] = K_band
+    for k in range(1, u + 1):
+        ab[2 * u + k, :n - k] = K_band[u - k, k:]
+    lu, piv, info = dgbtrf(ab, u, u)
+    if info != 0:
+        raise ValueError("Structure is unstable or mechanism.")
+    
+    def solve(b):
+        x, info = dgbtrs(lu, u, u, b, piv)
+        return x
+    solve.nbytes = lu.nbytes + piv.nbytes
+    return solve
+
+
+def _factorize_banded(K_band):
+    # Banded Cholesky factorization; returns a function solving K x = b
+    # for one or more right-hand sides. O(n) time and memory.
+    # Cholesky is backward stable, but a badly conditioned matrix (elements of
+    # very different lengths) can still give a solution that does not satisfy
+    # equilibrium, so every solve checks its residual, refines it once and
+    # raises if it is still too large rather than return wrong reactions.
+    if K_band.shape[1] == 0:
+        # Every DOF is restrained
+        return lambda b: np.zeros(np.shape(b))
+    try:
+        c = cholesky_banded(K_band, lower=False)
+        raw_solve = lambda b: cho_solve_banded((c, False), b)
+        raw_solve.nbytes = c.nbytes
+        message = "Beam model is too ill-conditioned to solve accurately (are supports or loads almost coincident?)"
+    except np.linalg.LinAlgError:
+        # Not numerically positive definite: a mechanism, or an ill-conditioned
+        # but stable structure that LU with pivoting can still solve
+        raw_solve = _factorize_banded_lu(K_band)
+        message = "Structure is unstable or mechanism."
+    
+    def solve(b):
+        b = np.asarray(b, dtype=float)
+        x = raw_solve(b)
+        r = b - _banded_matvec(K_band, x)
+        if _inaccurate(r, b):
+            x = x + raw_solve(r) # one step of iterative refinement
+            r = b - _banded_matvec(K_band, x)
+            if _inaccurate(r, b):
+                raise ValueError(message)
+        return x
+    solve.nbytes = K_band.nbytes + raw_solve.nbytes
+    return solve
+
+
+def _inaccurate(r, b):
+    # True if any column of K x - b is large compared to its right-hand side
+    with np.errstate(invalid='ignore'):
+        return bool(np.any(~(np.abs(r).max(axis=0) <= RESIDUAL_TOLERANCE * np.abs(b).max(axis=0))))
+
+
+def _real_roots_in_unit(c):
+    # Real roots in (0, 1) of the polynomials sum_k c[i, k] s^k (one per row), found
+    # together as eigenvalues of stacked companion matrices. Rows whose leading
+    # coefficients vanish are solved at their actual degree. Returns (row, s) pairs.
+    rows, roots = [], []
+    scale = np.abs(c).max(axis=1)
+    nonzero = np.abs(c) > 1e-12 * scale[:, None]
+    degree = np.where(nonzero.any(axis=1), c.shape[1] - 1 - np.argmax(nonzero[:, ::-1], axis=1), 0)
+    for deg in range(1, c.shape[1]):
+        idx = np.flatnonzero(degree == deg)
+        if len(idx) == 0:
+            continue
+        monic = c[idx, :deg] / c[idx, deg][:, None]
+        companion = np.zeros((len(idx), deg, deg))
+        companion[:, 1:, :-1] = np.eye(deg - 1)
+        companion[:, :, -1] = -monic
+        eig = np.linalg.eigvals(companion)
+        real = (np.abs(eig.imag) <= 1e-9 * np.maximum(1.0, np.abs(eig.real))) & \
+               (eig.real > 0) & (eig.real < 1)
+        r, k = np.nonzero(real)
+        rows.append(idx[r])
+        roots.append(eig.real[r, k])
+    if not rows:
+        return np.zeros(0, dtype=int), np.zeros(0)
+    return np.concatenate(rows), np.concatenate(roots)
+
+
+def _hermite_shapes(node_x, x):
+    # Host element of every point in x and the cubic Hermite shape functions
+    # [N1, N2, N3, N4] there (for DOFs v1, theta1, v2, theta2), shape (len(x), 4)
+    elem = np.clip(np.searchsorted(node_x, x, side='left') - 1, 0, len(node_x) - 2)
+    x1 = node_x[elem]
+    le = node_x[elem + 1] - x1
+    xi = x - x1
+    t = xi / le
+    
+    N1 = 1 - 3*t**2 + 2*t**3
+    N2 = xi * (1 - 2*t + t**2)
+    N3 = 3*t**2 - 2*t**3
+    N4 = xi * (t**2 - t)
+    return elem, np.stack([N1, N2, N3, N4], axis=1)
+
 
 class BeamSolver:
-    def __init__(self, length, E, I):
+    def __init__(self, length, E, I, cache=None):
         self.L = float(length)
         self.E = float(E)
         self.I = float(I)
-        self.supports = [] 
-        self.loads = []
-        self.dist_loads = [] # List of dicts: {'start': x, 'end': x, 'magnitude': F/m}
+        # Optional solver_cache.LRUCache shared between solvers: reuses K and its
+        # factorization when only load magnitudes change between solves
+        self.cache = cache
+        # Wall time per phase (seconds) and model size of the last solve
+        self.timings = {}
+        self.sizes = {}
+        self.supports = ColumnTable(**SUPPORT_FIELDS)
+        self.loads = ColumnTable(**LOAD_FIELDS)
+        self.dist_loads = ColumnTable(**DIST_LOAD_FIELDS) # magnitude in F/m
+
+    @classmethod
+    def from_arrays(cls, length, E, I, supports=(), loads=(), dist_loads=(), cache=None):
+        # Bulk constructor. Each section is a list of records or a mapping of
+        # equal-length columns (see model_arrays.columns):
+        #   supports: pos, type     loads: pos, magnitude     dist_loads: start, end, magnitude
+        solver = cls(length, E, I, cache=cache)
+        solver.supports.extend(columns(supports, SUPPORT_FIELDS))
+        solver.loads.extend(columns(loads, LOAD_FIELDS))
+        solver.dist_loads.extend(columns(dist_loads, DIST_LOAD_FIELDS))
+        return solver
 
     def add_support(self, pos, type):
-        self.supports.append({'pos': float(pos), 'type': type})
-        
+        self.supports.append(pos=float(pos), type=type)
+
     def add_load(self, pos, magnitude):
-        self.loads.append({'pos': float(pos), 'magnitude': float(magnitude)})
+        self.loads.append(pos=float(pos), magnitude=float(magnitude))
 
     def add_dist_load(self, start, end, magnitude):
-        self.dist_loads.append({'start': float(start), 'end': float(end), 'magnitude': float(magnitude)})
-
-    def solve(self):
-        # 1. Discretize the beam
-        nodes = set([0.0, self.L])
-        for s in self.supports:
-            nodes.add(s['pos'])
-        for l in self.loads:
-            nodes.add(l['pos'])
-        for dl in self.dist_loads:
-            nodes.add(dl['start'])
-            nodes.add(dl['end'])
-        
-        sorted_nodes = sorted(list(nodes))
-        node_map = {x: i for i, x in enumerate(sorted_nodes)}
-        num_nodes = len(sorted_nodes)
-        num_dof = 2 * num_nodes 
+        self.dist_loads.append(start=float(start), end=float(end), magnitude=float(magnitude))
+
+    def solve(self, num_points=500, output='sampled'):
+        # num_points: number of evenly spaced samples in the returned diagrams
+        # output: 'sampled' (x, deflection, shear, moment at num_points) or
+        # 'polynomial' (exact piecewise polynomials and extrema, see _polynomials)
+        if output not in ('sampled', 'polynomial'):
+            raise ValueError(f"Unknown output mode: {output}")
+        self.timings = {}
+        plot_x = self._sample_points(num_points)
         
-        # 2. Assemble Global Stiffness Matrix (K) and Force Vector (F)
-        K = np.zeros((num_dof, num_dof))
-        F = np.zeros(num_dof)
+        with timed(self.timings, 'discretize'):
+            sorted_nodes, loads, dist_loads = self._discretize(self.loads, self.dist_loads)
+        self._record_sizes(sorted_nodes, len(self.loads) + len(self.dist_loads))
+        structure = self._structure(sorted_nodes)
+        with timed(self.timings, 'load_vector'):
+            F = self._load_vector(sorted_nodes, loads, dist_loads)
         
-        elements = []
+        with timed(self.timings, 'solve'):
+            d, R = self._solve_dofs(structure, F)
         
-        for i in range(num_nodes - 1):
-            x1 = sorted_nodes[i]
-            x2 = sorted_nodes[i+1]
-            le = x2 - x1
-            
-            # Element Stiffness Matrix
-            k_e = (self.E * self.I / le**3) * np.array([
-                [12, 6*le, -12, 6*le],
-                [6*le, 4*le**2, -6*le, 2*le**2],
-                [-12, -6*le, 12, -6*le],
-                [6*le, 2*le**2, -6*le, 4*le**2]
+        if output == 'polynomial':
+            with timed(self.timings, 'diagrams'):
+                result = self._polynomials(sorted_nodes, d, R, loads, dist_loads)
+            result['reactions'] = self._format_reactions(R, sorted_nodes)
+            return result
+        
+        with timed(self.timings, 'diagrams'):
+            plot_y, plot_v, plot_m = self._diagrams(plot_x, sorted_nodes, d, R, loads, dist_loads)
+
+        with timed(self.timings, 'format'):
+            return {
+                "x": plot_x.tolist(),
+                "deflection": plot_y.tolist(),
+                "shear": plot_v.tolist(),
+                "moment": plot_m.tolist(),
+                "reactions": self._format_reactions(R, sorted_nodes)
+            }
+
+    def solve_cases(self, cases, combinations=(), num_points=500):
+        # Solve several load cases on the same beam with one factorization.
+        # cases: [{'name': str, 'loads': [{'pos', 'magnitude'}], 'dist_loads': [{'start', 'end', 'magnitude'}]}],
+        # each load list may also be given as columns: {'pos': [...], 'magnitude': [...]}
+        # combinations: [{'name': str, 'factors': {case_name: factor}}]
+        # Loads added with add_load/add_dist_load are not used here; each case brings its own.
+        self.timings = {}
+        plot_x = self._sample_points(num_points)
+        names, parsed = parse_cases(cases, self._case_loads)
+        case_loads = [loads for loads, _ in parsed]
+        case_dist_loads = [dls for _, dls in parsed]
+        C = combination_matrix(names, combinations)
+        
+        # The mesh must contain every load position of every case so that K is shared
+        all_loads = {k: np.concatenate([loads[k] for loads in case_loads]) for k in LOAD_FIELDS}
+        all_dist_loads = {k: np.concatenate([dls[k] for dls in case_dist_loads]) for k in DIST_LOAD_FIELDS}
+        with timed(self.timings, 'discretize'):
+            sorted_nodes, all_loads, all_dist_loads = self._discretize(all_loads, all_dist_loads)
+            # Back to one table per case, with the moved positions
+            load_splits = np.cumsum([len(loads['pos']) for loads in case_loads])[:-1]
+            dl_splits = np.cumsum([len(dls['start']) for dls in case_dist_loads])[:-1]
+            case_loads = [dict(zip(all_loads, cols)) for cols in
+                          zip(*(np.split(all_loads[k], load_splits) for k in all_loads))]
+            case_dist_loads = [dict(zip(all_dist_loads, cols)) for cols in
+                               zip(*(np.split(all_dist_loads[k], dl_splits) for k in all_dist_loads))]
+        self._record_sizes(sorted_nodes, len(all_loads['pos']) + len(all_dist_loads['start']), cases=len(names))
+        structure = self._structure(sorted_nodes)
+        
+        with timed(self.timings, 'load_vector'):
+            F = np.column_stack([
+                self._load_vector(sorted_nodes, loads, dls)
+                for loads, dls in zip(case_loads, case_dist_loads)
             ])
-            
-            indices = [2*i, 2*i+1, 2*(i+1), 2*(i+1)+1]
-            
-            for r in range(4):
-                for c in range(4):
-                    K[indices[r], indices[c]] += k_e[r, c]
-            
-            elements.append({'x1': x1, 'x2': x2, 'indices': indices})
-            
-            # Check if any distributed load covers this element
-            # Since we split nodes at start/end of DLs, a DL either covers an element fully or not at all
-            for dl in self.dist_loads:
-                # Check center of element to be safe against floating point equality issues
-                mid = (x1 + x2) / 2
-                if dl['start'] <= mid <= dl['end']:
-                    w = dl['magnitude'] 
-                    # Fixed End Forces for Uniform Load w (positive y direction)
-                    # But usually input w is negative for gravity.
-                    # Formulas below assume w is force per length.
-                    # Vertical Reaction: w*L/2
-                    # Moment Reaction: w*L^2/12 (CCW at left, CW at right)
-                    
-                    # Nodal Forces = - Fixed End Actions (The force applied TO the node from the external load)
-                    # Actually, in FEM formulation: F_node = Integral(N^T * w dx).
-                    # For uniform w:
-                    # f1y = w*L/2
-                    # m1 = w*L^2/12
-                    # f2y = w*L/2
-                    # m2 = -w*L^2/12
-                    
-                    f_equiv = np.array([
-                        w * le / 2,
-                        w * le**2 / 12,
-                        w * le / 2,
-                        -w * le**2 / 12
-                    ])
-                    
-                    for r in range(4):
-                        F[indices[r]] += f_equiv[r]
-
-        # 3. Apply Point Loads
-        for load in self.loads:
-            n_idx = node_map[load['pos']]
-            dof_idx = 2 * n_idx 
-            F[dof_idx] += load['magnitude'] 
-
-        # 4. Apply Boundary Conditions
-        fixed_dofs = []
-        for support in self.supports:
-            n_idx = node_map[support['pos']]
-            fixed_dofs.append(2 * n_idx)
-            if support['type'] == 'fixed':
-                fixed_dofs.append(2 * n_idx + 1)
+        with timed(self.timings, 'solve'):
+            d, R = self._solve_dofs(structure, F)
+        
+        # Diagrams per case; everything is linear in the loads, so combinations
+        # are weighted sums of the case results.
+        with timed(self.timings, 'diagrams'):
+            Y, V, M = (np.column_stack(cols) for cols in zip(*[
+                self._diagrams(plot_x, sorted_nodes, d[:, j], R[:, j], loads, dls)
+                for j, (loads, dls) in enumerate(zip(case_loads, case_dist_loads))
+            ]))
+        
+        def package(R_j, Y_j, V_j, M_j):
+            return {
+                "x": plot_x.tolist(),
+                "deflection": Y_j.tolist(),
+                "shear": V_j.tolist(),
+                "moment": M_j.tolist(),
+                "reactions": self._format_reactions(R_j, sorted_nodes)
+            }
+        
+        results = {
+            "cases": {name: package(R[:, j], Y[:, j], V[:, j], M[:, j])
+                      for j, name in enumerate(names)},
+            "combinations": {}
+        }
+        if C.shape[1]:
+            R, Y, V, M = R @ C, Y @ C, V @ C, M @ C
+            results["combinations"] = {combo['name']: package(R[:, j], Y[:, j], V[:, j], M[:, j])
+                                       for j, combo in enumerate(combinations)}
+        
+        # Envelope over the combinations if any were given, else over the cases
+        R = np.where(np.abs(R) < 1e-8, 0.0, R)
+        results["envelope"] = {
+            "x": plot_x.tolist(),
+            "deflection": min_max(Y),
+            "shear": min_max(V),
+            "moment": min_max(M),
+            "reactions": [{
+                'pos': pos,
+                'type': type,
+                'Fy': min_max(R[2 * n_idx]),
+                'Mz': min_max(R[2 * n_idx + 1])
+            } for pos, type, n_idx in zip(self.supports['pos'].tolist(), self.supports['type'].tolist(),
+                                          np.searchsorted(sorted_nodes, self.supports['pos']))]
+        }
+        return results
+
+    def influence_lines(self, positions):
+        # Support reactions caused by a unit load (magnitude +1, same sign convention
+        # as add_load) placed at each of `positions`.
+        # With R = K_cf d_f - F_c and d_f = K_ff^-1 F_f, reaction c responds to nodal
+        # load vector F as H[c] . F with H = [K_cf K_ff^-1 | -I]; this needs one solve
+        # per restrained DOF. A point load at p maps to nodal loads through the Hermite
+        # shape functions, which is exact for Euler-Bernoulli elements, so the lines
+        # are exact at every position without refining the mesh.
+        # Returns (support positions, Fy lines, Mz lines), lines shaped (n_supports, len(positions)).
+        positions = np.asarray(positions, dtype=float)
+        sorted_nodes, _, _ = self._discretize(columns([], LOAD_FIELDS), columns([], DIST_LOAD_FIELDS))
+        K_band, free_dofs, factor = self._structure(sorted_nodes)
+        num_dof = K_band.shape[1]
+        
+        fixed = np.ones(num_dof, dtype=bool)
+        fixed[free_dofs] = False
+        fixed_dofs = np.flatnonzero(fixed)
+        
+        unit = np.zeros((num_dof, len(fixed_dofs)))
+        unit[fixed_dofs, np.arange(len(fixed_dofs))] = 1.0
+        K_fc = _banded_matvec(K_band, unit)[free_dofs]
+        H = np.zeros((len(fixed_dofs), num_dof))
+        H[:, free_dofs] = factor(K_fc).T # K is symmetric: K_cf K_ff^-1 = (K_ff^-1 K_fc)^T
+        H[np.arange(len(fixed_dofs)), fixed_dofs] = -1.0
+        
+        elem, N = _hermite_shapes(sorted_nodes, positions)
+        dofs = 2 * elem[:, None] + np.arange(4)
+        lines = np.zeros((num_dof, len(positions)))
+        lines[fixed_dofs] = np.sum(H[:, dofs] * N[None], axis=2)
+        
+        support_pos = np.unique(self.supports['pos'])
+        support_nodes = np.searchsorted(sorted_nodes, support_pos)
+        return support_pos, lines[2 * support_nodes], lines[2 * support_nodes + 1]
+
+    def moving_load(self, axles, num_positions=2000, num_sections=201):
+        # Envelopes for a train of concentrated loads crossing the beam.
+        # axles: [{'offset': distance from the lead axle, 'magnitude': force}]
+        # The lead axle steps through num_positions positions, from where the first
+        # axle enters the beam to where the last one leaves it. Shear and moment are
+        # enveloped at num_sections evenly spaced sections. Loads added with add_load /
+        # add_dist_load are not included.
+        if not axles:
+            raise ValueError("At least one axle is required")
+        if int(num_positions) < 2:
+            raise ValueError("num_positions must be at least 2")
+        offsets = np.array([float(a['offset']) for a in axles])
+        magnitudes = np.array([float(a['magnitude']) for a in axles])
+        sections = self._sample_points(num_sections)
+        
+        lead = np.linspace(-offsets.max(), self.L - offsets.min(), int(num_positions))
+        axle_x = lead[:, None] + offsets[None, :] # (n_positions, n_axles)
+        on_beam = (axle_x >= 0) & (axle_x <= self.L)
+        P = np.where(on_beam, magnitudes[None, :], 0.0)
+        
+        # Reactions by superposition of the influence lines
+        support_pos, Fy_lines, Mz_lines = self.influence_lines(np.clip(axle_x, 0, self.L).ravel())
+        Fy = np.sum(Fy_lines.reshape((-1,) + axle_x.shape) * P, axis=2) # (n_supports, n_positions)
+        Mz = np.sum(Mz_lines.reshape((-1,) + axle_x.shape) * P, axis=2)
+        
+        # Shear and moment at each section from statics, as in the diagrams:
+        # everything at or left of the section (1e-9 tolerance) counts.
+        left_support = support_pos[:, None] <= sections[None, :] + 1e-9 # (n_supports, n_sections)
+        arm = np.where(left_support, sections[None, :] - support_pos[:, None], 0.0)
+        V = Fy.T @ left_support + np.einsum('ta,tas->ts', P, axle_x[:, :, None] <= sections + 1e-9)
+        M = Fy.T @ arm - Mz.T @ left_support + \
+            np.einsum('ta,tas->ts', P, np.clip(sections - axle_x[:, :, None], 0, None) *
+                      (axle_x[:, :, None] <= sections + 1e-9))
+        
+        def envelope(values):
+            # values: (n_positions, ...) -> extreme values and the lead position that causes them
+            i_max = np.argmax(values, axis=0)
+            i_min = np.argmin(values, axis=0)
+            return {
+                'max': np.max(values, axis=0).tolist(),
+                'max_at': lead[i_max].tolist(),
+                'min': np.min(values, axis=0).tolist(),
+                'min_at': lead[i_min].tolist()
+            }
+        
+        def governing(values):
+            # Single worst value over all sections: value, section and lead position
+            t_max, s_max = np.unravel_index(np.argmax(values), values.shape)
+            t_min, s_min = np.unravel_index(np.argmin(values), values.shape)
+            return {
+                'max': {'value': float(values[t_max, s_max]), 'x': float(sections[s_max]), 'position': float(lead[t_max])},
+                'min': {'value': float(values[t_min, s_min]), 'x': float(sections[s_min]), 'position': float(lead[t_min])}
+            }
+        
+        support_rows = list(zip(self.supports['pos'].tolist(), self.supports['type'].tolist(),
+                                np.searchsorted(support_pos, self.supports['pos']).tolist()))
+        reactions = [{
+            'pos': pos,
+            'type': type,
+            'Fy': envelope(Fy[j]),
+            'Mz': envelope(Mz[j])
+        } for pos, type, j in support_rows]
+        
+        # Unit-load influence lines of the reactions, sampled at the sections for display
+        _, Fy_lines, Mz_lines = self.influence_lines(sections)
+        
+        return {
+            'positions': {'start': float(lead[0]), 'end': float(lead[-1]), 'count': len(lead)},
+            'reactions': reactions,
+            'shear': dict(x=sections.tolist(), **envelope(V), governing=governing(V)),
+            'moment': dict(x=sections.tolist(), **envelope(M), governing=governing(M)),
+            'influence_lines': {
+                'x': sections.tolist(),
+                'reactions': [{
+                    'pos': pos,
+                    'Fy': Fy_lines[j].tolist(),
+                    'Mz': Mz_lines[j].tolist()
+                } for pos, _, j in support_rows]
+            }
+        }
+
+    def _sample_points(self, num_points):
+        if int(num_points) < 2:
+            raise ValueError("num_points must be at least 2")
+        return np.linspace(0, self.L, int(num_points))
+
+    def _record_sizes(self, sorted_nodes, num_loads, cases=1):
+        self.sizes = {
+            'dofs': 2 * len(sorted_nodes),
+            'elements': len(sorted_nodes) - 1,
+            'loads': num_loads,
+            'cases': cases
+        }
+
+    def _case_loads(self, case):
+        return columns(case.get('loads', []), LOAD_FIELDS), columns(case.get('dist_loads', []), DIST_LOAD_FIELDS)
+
+    def _discretize(self, loads, dist_loads):
+        # 1. Discretize the beam: a node at both ends, every support and every load
+        # position (sorted, unique). Returns (sorted_nodes, loads, dist_loads) with the
+        # load positions moved onto their nodes.
+        # Near-zero elements make K too ill-conditioned to solve, so load positions
+        # closer than NODE_MERGE_TOLERANCE of the mean element length to a support or
+        # beam end move onto it, and runs of closer load positions share the first
+        # one's node. Supports and ends never move; supports that almost coincide
+        # are an error.
+        positions = np.unique(np.concatenate([
+            [0.0, self.L], self.supports['pos'], loads['pos'], dist_loads['start'], dist_loads['end']
+        ]))
+        tol = NODE_MERGE_TOLERANCE * (positions[-1] - positions[0]) / max(len(positions) - 1, 1)
+        
+        support_pos = np.unique(self.supports['pos'])
+        close = np.flatnonzero(np.diff(support_pos) <= tol)
+        if len(close):
+            a, b = support_pos[close[0]], support_pos[close[0] + 1]
+            raise ValueError(f"Supports at {a:g} and {b:g} almost coincide; "
+                             f"use one support or move them more than {tol:g} apart")
+        
+        fixed = np.unique(np.concatenate([[0.0, self.L], support_pos]))
+        i = np.clip(np.searchsorted(fixed, positions), 1, len(fixed) - 1)
+        gap = np.minimum(np.abs(positions - fixed[i - 1]), np.abs(fixed[i] - positions))
+        snapped = np.where(np.abs(positions - fixed[i - 1]) <= np.abs(fixed[i] - positions), fixed[i - 1], fixed[i])
+        free = gap > tol
+        # Remaining positions: each run closer than tol shares its first position
+        rest = positions[free]
+        first = np.diff(rest, prepend=-np.inf) > tol
+        node_of = np.where(free, 0.0, snapped)
+        node_of[free] = rest[first][np.cumsum(first) - 1]
+        sorted_nodes = np.unique(node_of)
+        
+        def move(x):
+            return node_of[np.searchsorted(positions, x)]
+        loads = {'pos': move(loads['pos']), 'magnitude': loads['magnitude']}
+        dist_loads = {'start': move(dist_loads['start']), 'end': move(dist_loads['end']),
+                      'magnitude': dist_loads['magnitude']}
+        return sorted_nodes, loads, dist_loads
+
+    def _structure(self, sorted_nodes):
+        # (K_band, free_dofs, factorization of K_ff). The mesh depends on load positions,
+        # so a cached entry is reused when loads change magnitude but not position.
+        key = None
+        if self.cache is not None:
+            supports = sorted(zip(self.supports['pos'].tolist(), (self.supports['type'] == 'fixed').tolist()))
+            key = structure_key('beam', [self.L, self.E, self.I], supports, sorted_nodes)
+            structure = self.cache.get(key)
+            if structure is not None:
+                return structure
+        
+        with timed(self.timings, 'assemble'):
+            K_band, free_dofs = self._assemble(sorted_nodes)
+        with timed(self.timings, 'factorize'):
+            factor = _factorize_banded(_banded_submatrix(K_band, free_dofs))
+        structure = (K_band, free_dofs, factor)
+        
+        if key is not None:
+            self.cache.put(key, structure)
+        return structure
+
+    def _assemble(self, sorted_nodes):
+        # 2. Assemble Global Stiffness Matrix (K)
+        # Element i couples DOFs 2i..2i+3, so K has half-bandwidth 3. Only the upper
+        # band is stored, LAPACK style: K[r, c] lives in K_band[BANDWIDTH + r - c, c].
+        num_nodes = len(sorted_nodes)
+        num_dof = 2 * num_nodes 
+        node_x = np.array(sorted_nodes)
+        le = np.diff(node_x)
+        num_elem = num_nodes - 1
+        first_dof = 2 * np.arange(num_elem)
+        
+        # Element Stiffness Matrices, one (4, 4) block per element
+        k_e = beam_stiffness(le, self.E * self.I)
+        K_band = scatter_banded(k_e, first_dof, num_dof, BANDWIDTH)
+        
+        # Boundary Conditions
+        # The rigid-body modes of a beam (vertical translation and rotation) are restrained
+        # by a fixed support or by vertical restraints at two different positions.
+        is_fixed = self.supports['type'] == 'fixed'
+        if not is_fixed.any() and len(np.unique(self.supports['pos'])) < 2:
+            raise ValueError("Structure is unstable or mechanism.")
+
+        n_idx = np.searchsorted(node_x, self.supports['pos'])
+        fixed = np.zeros(num_dof, dtype=bool)
+        fixed[2 * n_idx] = True
+        fixed[2 * n_idx[is_fixed] + 1] = True
                 
-        fixed_dofs = sorted(list(set(fixed_dofs)))
-        free_dofs = [i for i in range(num_dof) if i not in fixed_dofs]
+        free_dofs = np.flatnonzero(~fixed)
+        return K_band, free_dofs
+
+    def _load_vector(self, sorted_nodes, loads, dist_loads):
+        # 3. Force Vector (F)
+        node_x = np.array(sorted_nodes)
+        le = np.diff(node_x)
+        first_dof = 2 * np.arange(len(le))
+        F = np.zeros(2 * len(sorted_nodes))
         
-        # Solve
-        K_ff = K[np.ix_(free_dofs, free_dofs)]
+        # Distributed loads: total intensity w on each element.
+        # Consistent nodal forces for uniform w: [w*L/2, w*L^2/12, w*L/2, -w*L^2/12]
+        if len(dist_loads['start']):
+            w = self._element_udl(node_x, dist_loads)
+            F[first_dof] += w * le / 2
+            F[first_dof + 1] += w * le**2 / 12
+            F[first_dof + 2] += w * le / 2
+            F[first_dof + 3] += -w * le**2 / 12
+
+        # Point Loads
+        F += np.bincount(2 * np.searchsorted(node_x, loads['pos']), weights=loads['magnitude'], minlength=len(F))
+        return F
+
+    def _element_udl(self, node_x, dist_loads):
+        # Total distributed load intensity on each element. Nodes are split at the
+        # start/end of every DL, so a DL covers an element fully or not at all and
+        # testing the element midpoint is safe against floating point equality issues.
+        mid = (node_x[:-1] + node_x[1:]) / 2
+        if not len(dist_loads['start']):
+            return np.zeros_like(mid)
+        # w(mid) = (sum of DLs with start <= mid) - (sum of DLs with end < mid)
+        starts = dist_loads['start']
+        ends = dist_loads['end']
+        mags = dist_loads['magnitude']
+        by_start = np.argsort(starts, kind='stable')
+        by_end = np.argsort(ends, kind='stable')
+        started = np.concatenate(([0.0], np.cumsum(mags[by_start])))
+        ended = np.concatenate(([0.0], np.cumsum(mags[by_end])))
+        return started[np.searchsorted(starts[by_start], mid, side='right')] - \
+            ended[np.searchsorted(ends[by_end], mid, side='left')]
+
+    def _solve_dofs(self, structure, F):
+        # Solve for one load vector F (num_dof,) or several at once (num_dof, n_cases)
+        K_band, free_dofs, factor = structure
         F_f = F[free_dofs]
         
-        try:
-            d_f = np.linalg.solve(K_ff, F_f)
-        except np.linalg.LinAlgError:
-            # Handle unstable structures
-            raise ValueError("Structure is unstable or mechanism.")
+        d_f = factor(F_f)
 
-        d = np.zeros(num_dof)
+        d = np.zeros(F.shape)
         d[free_dofs] = d_f
         
         # Calculate Reactions: R = K * d - F_applied
         # Note: F_applied here includes the equivalent nodal loads from distributed loads
-        R = np.dot(K, d) - F
+        R = _banded_matvec(K_band, d) - F
+        return d, R
+
+    def _diagrams(self, plot_x, sorted_nodes, d, R, loads, dist_loads):
+        # Shear and moment by statics (method of sections), deflection from the
+        # element solution
+        plot_v, plot_m = self._section_forces(plot_x, sorted_nodes, R, loads, dist_loads)
         
-        # Post-processing: Calculate V(x) and M(x) using Statics (Method of Sections)
-        # This is more robust for arbitrary distributed loads than element shape functions
+        # Deflection: cubic Hermite interpolation of the nodal solution, which is exact
+        # at the nodes, plus the particular solution of a fixed-ended element under its
+        # uniform load, w xi^2 (le - xi)^2 / (24 EI). Together they are exact.
+        node_x = np.array(sorted_nodes)
+        elem, N = _hermite_shapes(node_x, plot_x)
+        dofs = 2 * elem[:, None] + np.arange(4)
+        plot_y = np.sum(N * d[dofs], axis=1)
+        if len(dist_loads['start']):
+            w = self._element_udl(node_x, dist_loads)
+            le = node_x[elem + 1] - node_x[elem]
+            xi = plot_x - node_x[elem]
+            plot_y = plot_y + w[elem] * xi**2 * (le - xi)**2 / (24 * self.E * self.I)
+        return plot_y, plot_v, plot_m
+
+    def _polynomials(self, sorted_nodes, d, R, loads, dist_loads):
+        # Exact diagrams as piecewise polynomials over the element mesh. On segment i
+        # (breakpoints[i] <= x <= breakpoints[i+1], xi = x - breakpoints[i]) a diagram
+        # is sum_k coefficients[k][i] * xi**k: shear linear, moment quadratic,
+        # deflection quartic (elements carry a uniform load and no point loads inside).
+        node_x = np.array(sorted_nodes)
+        x1 = node_x[:-1]
+        le = np.diff(node_x)
+        w = self._element_udl(node_x, dist_loads)
+        V0, M0 = self._section_forces(x1, sorted_nodes, R, loads, dist_loads) # just right of x1
+        
+        shear = np.stack([V0, w])
+        moment = np.stack([M0, V0, w / 2])
         
-        # 1. Collect all external forces (Point Loads + Supports + Distributed Loads)
-        # We will iterate along x and sum forces/moments.
-        
-        plot_x = np.linspace(0, self.L, 500) # High res for smooth curves
-        plot_v = []
-        plot_m = []
-        plot_y = [] # Deflection still from shape functions? 
-                    # Shape functions are exact at nodes but approximate inside for UDL unless we add the particular solution.
-                    # However, calculating deflection from V/M integration is also complex.
-                    # Given high discretization (elements are split at load changes), the shape function error is small.
-                    # BUT, for V and M diagrams, shape functions give linear/constant results which look bad for UDL (parabolic M).
-                    # So we use Statics for V and M, and Shape Functions for Deflection.
-        
-        # Pre-calculate reaction dictionary for easy lookup
-        reaction_dict = {} # pos -> {'Fy': val, 'Mz': val}
-        for s in self.supports:
-            n_idx = node_map[s['pos']]
-            reaction_dict[s['pos']] = {
-                'Fy': R[2*n_idx],
-                'Mz': R[2*n_idx+1]
+        # Hermite interpolation of (v1, th1, v2, th2) plus w xi^2 (le - xi)^2 / (24 EI)
+        v1, t1, v2, t2 = d[0:-2:2], d[1:-2:2], d[2::2], d[3::2]
+        q = w / (24 * self.E * self.I)
+        deflection = np.stack([
+            v1,
+            t1,
+            (-3*v1 - 2*t1*le + 3*v2 - t2*le) / le**2 + q * le**2,
+            (2*v1 + t1*le - 2*v2 + t2*le) / le**3 - 2 * q * le,
+            q
+        ])
+        
+        return {
+            'mode': 'polynomial',
+            'breakpoints': node_x.tolist(),
+            'shear': shear.tolist(),
+            'moment': moment.tolist(),
+            'deflection': deflection.tolist(),
+            'extrema': {
+                'shear': self._extrema(x1, le, shear),
+                'moment': self._extrema(x1, le, moment),
+                'deflection': self._extrema(x1, le, deflection)
             }
+        }
 
-        for x in plot_x:
-            # Calculate Shear (Sum of vertical forces to left) and Moment (Sum of moments to left)
-            
-            # 1. Reactions
-            shear_val = 0
-            moment_val = 0
-            
-            for pos, r in reaction_dict.items():
-                if pos <= x + 1e-9:
-                    shear_val += r['Fy']
-                    # For internal moment M(x), we subtract the external reaction moment Mz.
-                    # Why? M(x) = Ry*x - M1. (Where M1 is CCW reaction moment).
-                    # Or generally M(x) = -Sum(Moments_Left_About_x).
-                    # Sum includes +Mz (if CCW). So we subtract r['Mz'].
-                    moment_val += r['Fy'] * (x - pos) - r['Mz']
-            
-            # 2. Point Loads
-            for l in self.loads:
-                if l['pos'] <= x + 1e-9:
-                    shear_val += l['magnitude']
-                    moment_val += l['magnitude'] * (x - l['pos'])
-            
-            # 3. Distributed Loads
-            for dl in self.dist_loads:
-                if dl['start'] < x:
-                    # Overlap length
-                    end_x = min(x, dl['end'])
-                    length = end_x - dl['start']
-                    if length > 0:
-                        force = dl['magnitude'] * length
-                        centroid = dl['start'] + length / 2
-                        shear_val += force
-                        moment_val += force * (x - centroid)
-            
-            plot_v.append(shear_val)
-            plot_m.append(moment_val)
-            
-            # Deflection (Interpolate using shape functions)
-            # Find which element x is in
-            for elem in elements:
-                if elem['x1'] <= x <= elem['x2']:
-                    # Evaluate shape function
-                    x1 = elem['x1']
-                    x2 = elem['x2']
-                    le = x2 - x1
-                    xi = x - x1
-                    
-                    if le == 0: continue # Should not happen
-                    
-                    indices = elem['indices']
-                    d_elem = d[indices]
-                    
-                    N1 = 1 - 3*(xi/le)**2 + 2*(xi/le)**3
-                    N2 = xi * (1 - 2*(xi/le) + (xi/le)**2)
-                    N3 = 3*(xi/le)**2 - 2*(xi/le)**3
-                    N4 = xi * ((xi/le)**2 - (xi/le))
-                    
-                    y_val = (N1*d_elem[0] + N2*d_elem[1] + N3*d_elem[2] + N4*d_elem[3])
-                    
-                    # Add approximate particular solution for UDL deflection if needed?
-                    # Standard FEM usually just uses the nodal values. 
-                    # With sufficient elements, this is close.
-                    # Our nodes are split at load start/ends, but if load covers a long span, 
-                    # the mid-span deflection might be slightly off if we don't use the exact UDL shape function.
-                    # But usually it's "exact at nodes".
-                    # For small apps, this is usually acceptable.
-                    
-                    plot_y.append(y_val)
-                    break
-            else:
-                 # Should verify if x=L is handled (it falls in last element usually due to <=)
-                 if len(plot_y) < len(plot_v):
-                     plot_y.append(0) # boundary case
-
+    def _extrema(self, x1, le, coefficients):
+        # Global max and min of a piecewise polynomial: segment ends plus interior
+        # stationary points, i.e. real roots of the derivative in each segment
+        n = len(le)
+        powers = np.arange(coefficients.shape[0])
+        # Candidates: both ends of every segment (diagrams jump at point loads)
+        seg = np.concatenate([np.arange(n), np.arange(n)])
+        xi = np.concatenate([np.zeros(n), le])
+        if coefficients.shape[0] > 2:
+            # Derivative in the unit variable s = xi / le, so coefficients are comparable
+            deriv = (coefficients[1:] * powers[1:, None]).T * le[:, None] ** powers[1:]
+            rows, s = _real_roots_in_unit(deriv)
+            seg = np.concatenate([seg, rows])
+            xi = np.concatenate([xi, s * le[rows]])
+        values = np.einsum('ki,ik->i', coefficients[:, seg], xi[:, None] ** powers)
+        i_max, i_min = np.argmax(values), np.argmin(values)
         return {
-            "x": plot_x.tolist(),
-            "deflection": plot_y,
-            "shear": plot_v,
-            "moment": plot_m,
-            "reactions": self._format_reactions(R, sorted_nodes, node_map)
+            'max': {'value': values[i_max], 'x': x1[seg[i_max]] + xi[i_max]},
+            'min': {'value': values[i_min], 'x': x1[seg[i_min]] + xi[i_min]}
         }
 
-    def _format_reactions(self, R, sorted_nodes, node_map):
+    def _section_forces(self, x, sorted_nodes, R, loads, dist_loads):
+        # V(x) and M(x) using Statics (Method of Sections)
+        # This is more robust for arbitrary distributed loads than element shape functions
+        # Shear and moment at every point are evaluated together: all concentrated
+        # actions are sorted by position once, and the sum over "everything to the
+        # left of x" becomes a searchsorted lookup into cumulative sums.
+        
+        # 1. Concentrated forces (support reactions + point loads) and reaction moments
+        # (several supports at one position share a node, so count each position once)
+        support_pos = np.unique(self.supports['pos'])
+        support_nodes = np.searchsorted(sorted_nodes, support_pos)
+        force_pos = np.concatenate([support_pos, loads['pos']])
+        force_mag = np.concatenate([R[2 * support_nodes], loads['magnitude']])
+        moment_pos = support_pos
+        moment_mag = R[2 * support_nodes + 1]
+        
+        V, M = self._concentrated_actions(x, force_pos, force_mag, moment_pos, moment_mag)
+        
+        # 2. Distributed loads
+        # A UDL w on [a, b] equals a load w starting at a plus a load -w starting at b.
+        # A load c starting at a contributes c*(x - a) to V and c*(x - a)^2/2 to M for x > a.
+        ramp_pos = np.concatenate([dist_loads['start'], dist_loads['end']])
+        ramp_mag = np.concatenate([dist_loads['magnitude'], -dist_loads['magnitude']])
+        if len(ramp_pos):
+            order = np.argsort(ramp_pos, kind='stable')
+            ramp_pos = ramp_pos[order]
+            ramp_mag = ramp_mag[order]
+            k = np.searchsorted(ramp_pos, x, side='left')
+            c0 = np.concatenate(([0.0], np.cumsum(ramp_mag)))[k]
+            c1 = np.concatenate(([0.0], np.cumsum(ramp_mag * ramp_pos)))[k]
+            c2 = np.concatenate(([0.0], np.cumsum(ramp_mag * ramp_pos**2)))[k]
+            V = V + x * c0 - c1
+            M = M + (x**2 * c0 - 2 * x * c1 + c2) / 2
+        return V, M
+
+    def _concentrated_actions(self, x, force_pos, force_mag, moment_pos, moment_mag):
+        # V(x) = sum of forces left of x, M(x) = sum of F*(x - pos) - sum of Mz left of x.
+        # Actions exactly at x count as "left" (same 1e-9 tolerance as the section cut).
+        force_pos = np.asarray(force_pos, dtype=float)
+        force_mag = np.asarray(force_mag, dtype=float)
+        moment_pos = np.asarray(moment_pos, dtype=float)
+        moment_mag = np.asarray(moment_mag, dtype=float)
+        
+        order = np.argsort(force_pos, kind='stable')
+        force_pos = force_pos[order]
+        force_mag = force_mag[order]
+        k = np.searchsorted(force_pos, x + 1e-9, side='right')
+        sum_f = np.concatenate(([0.0], np.cumsum(force_mag)))[k]
+        sum_fp = np.concatenate(([0.0], np.cumsum(force_mag * force_pos)))[k]
+        
+        order = np.argsort(moment_pos, kind='stable')
+        k = np.searchsorted(moment_pos[order], x + 1e-9, side='right')
+        sum_m = np.concatenate(([0.0], np.cumsum(moment_mag[order])))[k]
+        
+        return sum_f, x * sum_f - sum_fp - sum_m
+
+    def _format_reactions(self, R, sorted_nodes):
         reactions = []
-        for s in self.supports:
-            n_idx = node_map[s['pos']]
+        support_nodes = np.searchsorted(sorted_nodes, self.supports['pos']).tolist()
+        for pos, type, n_idx in zip(self.supports['pos'].tolist(), self.supports['type'].tolist(), support_nodes):
             fy = R[2 * n_idx]
             mz = R[2 * n_idx + 1]
             
@@ -244,8 +726,8 @@ class BeamSolver:
             if abs(mz) < 1e-8: mz = 0
             
             reactions.append({
-                'pos': s['pos'],
-                'type': s['type'],
+                'pos': pos,
+                'type': type,
                 'Fy': fy,
                 'Mz': mz
             })
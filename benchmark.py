@@ -0,0 +1,293 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import tasks
+from columnar import pack
+
+# Scaling benchmarks for the beam, frame and pillar solvers.
+#
+#   python benchmark.py                      # quick suite, results to benchmark_results.json
+#   python benchmark.py --suite full         # up to ~100k DOF
+#   python benchmark.py --baseline old.json  # exit status 1 on regressions
+#   python benchmark.py --http               # through the Flask endpoints (test client)
+#
+# Models are generated deterministically, so results are comparable between runs
+# and machines. Phase timings come from the solvers' own timers (solver.timings);
+# the minimum over repeats is reported. Solves bypass the factorization cache.
+
+# Relative slowdown of a case's total time counted as a regression, and an
+# absolute floor below which differences are treated as noise
+DEFAULT_THRESHOLD = 0.25
+NOISE_FLOOR = 0.002
+
+
+def make_beam(spans, loads_per_span, seed=0):
+    # Continuous beam over equal 5 m spans: pinned at the left end, rollers at every
+    # other support, point loads and one partial UDL per span at seeded positions.
+    # Positions snap to a 50 mm grid; loads microns apart would make K needlessly ill-conditioned.
+    rng = np.random.default_rng(seed)
+    span = 5.0
+    supports = [{'pos': 0.0, 'type': 'pin'}] + [{'pos': span * (i + 1), 'type': 'roller'} for i in range(spans)]
+    offsets = np.round(rng.uniform(0.05, 0.95, size=(spans, loads_per_span)) * span / 0.05) * 0.05
+    magnitudes = -rng.uniform(1e3, 50e3, size=(spans, loads_per_span))
+    loads = [{'pos': round(float(i * span + offsets[i, j]), 6), 'magnitude': float(magnitudes[i, j])}
+             for i in range(spans) for j in range(loads_per_span)]
+    dist_loads = [{'start': i * span + 0.5, 'end': i * span + 4.0, 'magnitude': -10e3} for i in range(spans)]
+    return {'length': span * spans, 'E': 200e9, 'I': 1e-4,
+            'supports': supports, 'loads': loads, 'dist_loads': dist_loads}
+
+
+def make_frame_grid(bays, storeys, seed=0):
+    # Rectangular portal grid: 6 m bays, 3.5 m storeys, fixed column bases,
+    # wind at the left column line and seeded gravity loads on every floor node
+    rng = np.random.default_rng(seed)
+    nodes, elements, supports, loads = [], [], [], []
+    node_id = lambda i, j: j * (bays + 1) + i + 1
+    for j in range(storeys + 1):
+        for i in range(bays + 1):
+            nodes.append({'id': node_id(i, j), 'x': 6.0 * i, 'y': 3.5 * j})
+    for j in range(storeys):
+        for i in range(bays + 1):
+            elements.append({'id': len(elements) + 1, 'n1': node_id(i, j), 'n2': node_id(i, j + 1),
+                             'E': 200e9, 'A': 0.02, 'I': 2e-4})
+    for j in range(1, storeys + 1):
+        for i in range(bays):
+            elements.append({'id': len(elements) + 1, 'n1': node_id(i, j), 'n2': node_id(i + 1, j),
+                             'E': 200e9, 'A': 0.01, 'I': 1e-4})
+    for i in range(bays + 1):
+        supports.append({'node': node_id(i, 0), 'type': 'fixed'})
+    for j in range(1, storeys + 1):
+        loads.append({'node': node_id(0, j), 'fx': 10e3, 'fy': 0.0, 'm': 0.0})
+        for i in range(bays + 1):
+            loads.append({'node': node_id(i, j), 'fx': 0.0, 'fy': -float(rng.uniform(20e3, 80e3)), 'm': 0.0})
+    return {'nodes': nodes, 'elements': elements, 'supports': supports, 'loads': loads}
+
+
+def make_tower(storeys, seed=0):
+    # Slender braced tower: two columns 4 m apart, a floor beam and one diagonal
+    # brace per 4 m storey, pinned bases, seeded lateral loads at every floor
+    rng = np.random.default_rng(seed)
+    nodes, elements, loads = [], [], []
+    for j in range(storeys + 1):
+        nodes += [{'id': 2 * j + 1, 'x': 0.0, 'y': 4.0 * j}, {'id': 2 * j + 2, 'x': 4.0, 'y': 4.0 * j}]
+    for j in range(storeys):
+        a, b, c, d = 2 * j + 1, 2 * j + 2, 2 * j + 3, 2 * j + 4
+        for n1, n2, A, I in ((a, c, 0.03, 4e-4), (b, d, 0.03, 4e-4), (c, d, 0.01, 1e-4), (a, d, 0.005, 1e-6)):
+            elements.append({'id': len(elements) + 1, 'n1': n1, 'n2': n2, 'E': 200e9, 'A': A, 'I': I})
+        loads.append({'node': c, 'fx': float(rng.uniform(5e3, 15e3)), 'fy': -20e3, 'm': 0.0})
+    supports = [{'node': 1, 'type': 'pin'}, {'node': 2, 'type': 'pin'}]
+    return {'nodes': nodes, 'elements': elements, 'supports': supports, 'loads': loads}
+
+
+def make_pillar_sweep(points):
+    # Square length x I design grid over all four end conditions
+    return {'length': {'start': 1.0, 'stop': 12.0, 'num': points},
+            'E': 200e9,
+            'I': {'start': 1e-6, 'stop': 1e-3, 'num': points, 'log': True},
+            'A': 0.01,
+            'k_type': ['pin-pin', 'fixed-free', 'fixed-fixed', 'fixed-pin']}
+
+
+# (name, task kind, payload factory); each suite grows the models by roughly 10x per step
+SUITES = {
+    'quick': [
+        ('beam_3span', 'beam', lambda: make_beam(3, 2)),
+        ('beam_50span', 'beam', lambda: make_beam(50, 10)),
+        ('beam_500span', 'beam', lambda: make_beam(500, 20)),
+        ('frame_grid_2x2', 'frame', lambda: make_frame_grid(2, 2)),
+        ('frame_grid_10x10', 'frame', lambda: make_frame_grid(10, 10)),
+        ('frame_grid_30x30', 'frame', lambda: make_frame_grid(30, 30)),
+        ('tower_100', 'frame', lambda: make_tower(100)),
+        ('pillar', 'pillar', lambda: {'length': 3.0, 'E': 200e9, 'I': 1e-5, 'A': 0.01, 'k_type': 'pin-pin'}),
+        ('pillar_sweep_100', 'pillar_sweep', lambda: make_pillar_sweep(100))
+    ]
+}
+SUITES['full'] = SUITES['quick'] + [
+    ('beam_2500span', 'beam', lambda: make_beam(2500, 18)),
+    ('frame_grid_60x60', 'frame', lambda: make_frame_grid(60, 60)),
+    ('frame_grid_100x330', 'frame', lambda: make_frame_grid(100, 330)),
+    ('tower_4000', 'frame', lambda: make_tower(4000)),
+    ('pillar_sweep_1000', 'pillar_sweep', lambda: make_pillar_sweep(1000))
+]
+
+# Endpoint per task kind for --http
+ENDPOINTS = {
+    'beam': '/calculate',
+    'frame': '/calculate_frame',
+    'pillar': '/calculate_pillar',
+    'pillar_sweep': '/calculate_pillar_sweep'
+}
+
+
+def model_dofs(kind, data):
+    if kind == 'frame':
+        return 3 * len(data['nodes'])
+    if kind == 'beam':
+        solver = tasks.build_beam_solver(data)
+        return 2 * len(solver._discretize(solver.loads, solver.dist_loads))
+    return 0
+
+
+def run_direct(kind, data):
+    # One solve through tasks, plus the two serializations of the result
+    stats = {'timings': {}}
+    start = time.perf_counter()
+    result = tasks.run_task(kind, data, stats=stats)
+    elapsed = time.perf_counter() - start
+    timings = stats['timings'] or {'solve': elapsed}
+    body = {'status': 'success', 'data': result}
+    start = time.perf_counter()
+    json.dumps(body)
+    timings['encode_json'] = time.perf_counter() - start
+    start = time.perf_counter()
+    pack(body)
+    timings['encode_columnar'] = time.perf_counter() - start
+    timings['total'] = elapsed + timings['encode_json'] + timings['encode_columnar']
+    return timings, stats.get('sizes', {})
+
+
+def run_http(client, kind, data):
+    # One request through the Flask test client; phases come from Server-Timing.
+    # Cache-Control: no-cache makes the server solve instead of answering from its result cache.
+    start = time.perf_counter()
+    response = client.post(ENDPOINTS[kind], json=data, headers={'Cache-Control': 'no-cache'})
+    total = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"{ENDPOINTS[kind]} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    timings = {}
+    for item in response.headers.get('Server-Timing', '').split(','):
+        name, _, dur = item.strip().partition(';dur=')
+        if dur:
+            timings[name] = float(dur) / 1000
+    timings['total'] = total
+    return timings, {}
+
+
+def peak_memory(kind, data):
+    # Peak Python-heap allocation (numpy buffers included) during one solve.
+    # Memory held inside SuperLU/LAPACK is not visible to tracemalloc.
+    tracemalloc.start()
+    try:
+        tasks.run_task(kind, data)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(name, kind, factory, repeat, client=None, memory=True):
+    data = factory()
+    best, sizes = {}, {}
+    for _ in range(repeat):
+        timings, sizes = run_http(client, kind, data) if client is not None else run_direct(kind, data)
+        for phase, seconds in timings.items():
+            best[phase] = min(best.get(phase, seconds), seconds)
+    record = {
+        'name': name,
+        'kind': kind,
+        'dofs': sizes.get('dofs', model_dofs(kind, data)),
+        'repeat': repeat,
+        'timings': best,
+        'total': best['total']
+    }
+    if memory:
+        record['peak_memory_bytes'] = peak_memory(kind, data)
+    return record
+
+
+def compare(results, baseline, threshold):
+    # Cases slower than baseline by more than threshold (and the noise floor)
+    previous = {r['name']: r for r in baseline.get('results', [])}
+    regressions = []
+    for r in results:
+        old = previous.get(r['name'])
+        if old is None:
+            continue
+        ratio = r['total'] / old['total'] if old['total'] > 0 else float('inf')
+        r['baseline_total'] = old['total']
+        r['ratio'] = ratio
+        if ratio > 1 + threshold and r['total'] - old['total'] > NOISE_FLOOR:
+            regressions.append(r)
+    return regressions
+
+
+def print_table(results, out):
+    phases = []
+    for r in results:
+        phases += [p for p in r['timings'] if p != 'total' and p not in phases]
+    header = ['case', 'dofs'] + phases + ['total', 'peak MiB', 'vs base']
+    rows = []
+    for r in results:
+        row = [r['name'], str(r['dofs'])]
+        row += [f"{r['timings'][p] * 1000:.2f}" if p in r['timings'] else '-' for p in phases]
+        row.append(f"{r['total'] * 1000:.2f}")
+        row.append(f"{r['peak_memory_bytes'] / 2**20:.1f}" if 'peak_memory_bytes' in r else '-')
+        row.append(f"{r['ratio']:.2f}x" if 'ratio' in r else '-')
+        rows.append(row)
+    widths = [max(len(c) for c in col) for col in zip(header, *rows)]
+    print('  '.join(h.ljust(w) for h, w in zip(header, widths)), file=out)
+    print('(times in ms)', file=out)
+    for row in rows:
+        print('  '.join(c.ljust(w) for c, w in zip(row, widths)), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solver scaling benchmarks")
+    parser.add_argument('--suite', choices=sorted(SUITES), default='quick')
+    parser.add_argument('--only', help="run only cases whose name contains this string")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="relative slowdown that counts as a regression (default 0.25)")
+    parser.add_argument('--http', action='store_true', help="time requests through the Flask test client")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    args = parser.parse_args(argv)
+
+    client = None
+    if args.http:
+        from app import app, factor_cache
+        app.logger.disabled = True
+        factor_cache.maxsize = 0 # measure assembly and factorization every time
+        client = app.test_client()
+
+    cases = [c for c in SUITES[args.suite] if not args.only or args.only in c[0]]
+    results = []
+    for name, kind, factory in cases:
+        record = run_case(name, kind, factory, max(1, args.repeat), client, memory=not args.no_memory)
+        results.append(record)
+        print(f"{name}: {record['total'] * 1000:.2f} ms", file=sys.stderr)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+
+    report = {
+        'suite': args.suite,
+        'mode': 'http' if args.http else 'direct',
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'threshold': args.threshold,
+        'results': results,
+        'regressions': [r['name'] for r in regressions]
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_table(results, sys.stdout)
+    for r in regressions:
+        print(f"REGRESSION {r['name']}: {r['total'] * 1000:.2f} ms vs {r['baseline_total'] * 1000:.2f} ms "
+              f"({r['ratio']:.2f}x)", file=sys.stdout)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
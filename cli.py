@@ -0,0 +1,189 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import tasks
+from solver_cache import LRUCache
+
+# Headless batch runner: solves model files through tasks.run_task, the same code
+# path as the HTTP API, without the HTTP and request JSON overhead.
+#
+#   python cli.py models/ -o results/              # every model in models/, one process per CPU
+#   python cli.py tower.npz --kind frame -o out/   # kind for models that do not name one
+#   python cli.py models/ -o results/ --workers 1  # in this process
+#
+# Model formats:
+#   name.json   a request payload as POSTed to the API, plus an optional "kind"
+#               (a key of tasks.TASKS)
+#   name.npz    arrays named "<section>.<field>" (nodes.x, elements.E, loads.fy, ...)
+#               form column-shaped sections; other arrays are top-level settings
+#               ("kind", "length", ...), 0-d arrays as scalars
+#   name/       directory of .npy files named the same way, opened with
+#               mmap_mode='r' so large frames are paged in rather than copied; an
+#               optional model.json holds nested settings (load_cases, ...)
+#
+# Each result is written to <output>/<name>.json as soon as its solve finishes, as
+# the API's response body ({"status": "success", "data": ...} or {"status": "error",
+# "message": ...}). One JSON line per model goes to stdout; the exit status is 1 if
+# any model failed. Models are started largest file first, so one big model does
+# not end up running alone at the end.
+
+MODEL_SETTINGS = 'model.json'
+
+# Factorization cache of the current process (see _init_worker)
+_cache = None
+
+
+def _init_worker(cache_size):
+    global _cache
+    _cache = LRUCache(maxsize=cache_size)
+
+
+def _add_array(data, key, array):
+    # "<section>.<field>" -> data[section][field]; anything else is a setting
+    section, dot, field = key.partition('.')
+    if dot:
+        data.setdefault(section, {})[field] = array
+    elif array.ndim == 0:
+        data[key] = array.item()
+    else:
+        data[key] = array.tolist()
+
+
+def _is_model_dir(path):
+    return os.path.isdir(path) and any(
+        name.endswith('.npy') or name == MODEL_SETTINGS for name in os.listdir(path))
+
+
+def load_model(path):
+    # Model file or directory -> request payload (column sections stay arrays)
+    if os.path.isdir(path):
+        data = {}
+        settings = os.path.join(path, MODEL_SETTINGS)
+        if os.path.exists(settings):
+            with open(settings) as f:
+                data.update(json.load(f))
+        for name in sorted(os.listdir(path)):
+            if name.endswith('.npy'):
+                _add_array(data, name[:-4], np.load(os.path.join(path, name), mmap_mode='r', allow_pickle=False))
+        return data
+    if path.endswith('.npz'):
+        data = {}
+        with np.load(path, allow_pickle=False) as archive:
+            for key in archive.files:
+                _add_array(data, key, archive[key])
+        return data
+    with open(path) as f:
+        return json.load(f)
+
+
+def model_name(path):
+    base = os.path.basename(os.path.normpath(path))
+    return os.path.splitext(base)[0] if os.path.isfile(path) else base
+
+
+def find_models(paths):
+    # Model files and model directories among paths; other directories are
+    # searched one level deep
+    found = []
+    for path in paths:
+        if os.path.isfile(path) or _is_model_dir(path):
+            found.append(path)
+        elif os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                entry = os.path.join(path, name)
+                if (os.path.isfile(entry) and name.endswith(('.json', '.npz'))) or _is_model_dir(entry):
+                    found.append(entry)
+        else:
+            raise ValueError(f"No such model file or directory: {path}")
+    names = [model_name(p) for p in found]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise ValueError(f"Several models would write the same result file: {', '.join(duplicates)}")
+    return found
+
+
+def _disk_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, n)) for n in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def solve_file(path, default_kind, output_dir):
+    # Loads, solves and writes one model; returns a summary line. Runs in a pool worker.
+    start = time.perf_counter()
+    name = model_name(path)
+    summary = {'model': name, 'kind': default_kind}
+    stats = {'timings': {}}
+    try:
+        data = load_model(path)
+        kind = data.pop('kind', None) or default_kind
+        summary['kind'] = kind
+        if kind is None:
+            raise ValueError("Model has no kind; pass --kind")
+        body = {'status': 'success', 'data': tasks.run_task(kind, data, _cache, stats)}
+    except Exception as e:
+        body = {'status': 'error', 'message': str(e)}
+
+    target = os.path.join(output_dir, name + '.json')
+    partial = target + '.part'
+    with open(partial, 'w') as f:
+        json.dump(body, f, separators=(',', ':'))
+    os.replace(partial, target) # readers never see a half-written result
+
+    summary.update(status=body['status'], seconds=round(time.perf_counter() - start, 6), output=target)
+    if body['status'] == 'error':
+        summary['message'] = body['message']
+    summary['sizes'] = stats.get('sizes', {})
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve model files without the HTTP API")
+    parser.add_argument('paths', nargs='+', help="model files, model directories or directories of models")
+    parser.add_argument('-o', '--output', default='results', help="directory for the result files")
+    parser.add_argument('--kind', choices=sorted(tasks.TASKS), help="kind of models that do not name one")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per CPU; 1 solves in this process)")
+    parser.add_argument('--cache-size', type=int, default=8,
+                        help="factorizations cached per worker, reused by models that share a structure")
+    args = parser.parse_args(argv)
+
+    try:
+        models = find_models(args.paths)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 2
+    models.sort(key=_disk_size, reverse=True)
+    os.makedirs(args.output, exist_ok=True)
+
+    failed = 0
+    def report(summary):
+        nonlocal failed
+        failed += summary['status'] != 'success'
+        print(json.dumps(summary), flush=True)
+
+    workers = max(1, min(args.workers, len(models)))
+    if workers == 1:
+        _init_worker(args.cache_size)
+        for path in models:
+            report(solve_file(path, args.kind, args.output))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(args.cache_size,)) as pool:
+            futures = [pool.submit(solve_file, path, args.kind, args.output) for path in models]
+            for future in as_completed(futures):
+                report(future.result())
+
+    print(f"{len(models) - failed}/{len(models)} models solved", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import base64
+import json
+import struct
+
+import numpy as np
+
+# Compact columnar encodings for large numeric results, built from
+# little-endian typed arrays: base64 columns that travel inside JSON, and a
+# binary response format.
+
+DTYPES = ('float32', 'float64')
+
+
+def encode_array(values, dtype='float64'):
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported dtype: {dtype}")
+    arr = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<'))
+    return {
+        'dtype': dtype,
+        'shape': list(arr.shape),
+        'data': base64.b64encode(arr.tobytes()).decode('ascii')
+    }
+
+
+def decode_array(column):
+    dtype = np.dtype(column['dtype']).newbyteorder('<')
+    arr = np.frombuffer(base64.b64decode(column['data']), dtype=dtype)
+    return arr.reshape(column['shape'])
+
+
+# Binary response format (application/x-columnar), little-endian throughout:
+#   b'SCOL' | u8 version | 3 bytes padding | u32 header length | header JSON (utf-8)
+#   | padding to 8 bytes | column blocks, each starting on an 8-byte boundary
+# The header is {"doc": ..., "columns": [{"dtype", "offset", "length"}]} where
+# offsets are relative to the first block. "doc" is the original document with
+# every numeric list replaced by {"$col": index}, and every list of flat objects
+# replaced by {"$table": {"length": n, "columns": {key: {"$col": index} or [values]}}}.
+
+MEDIA_TYPE = 'application/x-columnar'
+MAGIC = b'SCOL'
+VERSION = 1
+
+_NUMPY_DTYPES = {'float32': '<f4', 'float64': '<f8', 'int32': '<i4'}
+
+
+def _is_number(v):
+    return isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, (bool, np.bool_))
+
+
+def _is_int(v):
+    return isinstance(v, (int, np.integer)) and not isinstance(v, (bool, np.bool_))
+
+
+def pack(doc, dtype='float64'):
+    if dtype not in DTYPES:
+        raise ValueError(f"Unsupported dtype: {dtype}")
+    blocks = []
+    columns = []
+    offset = 0
+
+    def add_column(values):
+        nonlocal offset
+        if all(_is_int(v) for v in values) and all(-2**31 <= v < 2**31 for v in values):
+            col_dtype = 'int32' # ids and counts stay exact
+        else:
+            col_dtype = dtype
+        data = np.asarray(values, dtype=_NUMPY_DTYPES[col_dtype]).tobytes()
+        pad = -len(data) % 8
+        blocks.append(data + b'\0' * pad)
+        columns.append({'dtype': col_dtype, 'offset': offset, 'length': len(values)})
+        offset += len(data) + pad
+        return {'$col': len(columns) - 1}
+
+    def convert(node):
+        if isinstance(node, dict):
+            return {k: convert(v) for k, v in node.items()}
+        if isinstance(node, (list, tuple)) and node:
+            if all(_is_number(v) for v in node):
+                return add_column(node)
+            if all(isinstance(v, dict) for v in node):
+                keys = list(node[0].keys())
+                if all(list(v.keys()) == keys for v in node) and \
+                        not any(isinstance(v[k], (dict, list)) for v in node for k in keys):
+                    table = {}
+                    for k in keys:
+                        values = [v[k] for v in node]
+                        table[k] = add_column(values) if all(_is_number(x) for x in values) else values
+                    return {'$table': {'length': len(node), 'columns': table}}
+            return [convert(v) for v in node]
+        return node
+
+    header = json.dumps({'doc': convert(doc), 'columns': columns}, separators=(',', ':')).encode('utf-8')
+    prefix = MAGIC + struct.pack('<B3xI', VERSION, len(header)) + header
+    prefix += b'\0' * (-len(prefix) % 8)
+    return prefix + b''.join(blocks)
+
+
+def unpack(data):
+    # Inverse of pack(); numeric columns come back as lists
+    if data[:4] != MAGIC:
+        raise ValueError("Not a columnar payload")
+    version, header_len = struct.unpack_from('<B3xI', data, 4)
+    if version != VERSION:
+        raise ValueError(f"Unsupported columnar version: {version}")
+    header = json.loads(data[12:12 + header_len].decode('utf-8'))
+    start = 12 + header_len
+    start += -start % 8
+    columns = [
+        np.frombuffer(data, dtype=_NUMPY_DTYPES[c['dtype']], count=c['length'],
+                      offset=start + c['offset']).tolist()
+        for c in header['columns']
+    ]
+
+    def revive(node):
+        if isinstance(node, dict):
+            if '$col' in node:
+                return columns[node['$col']]
+            if '$table' in node:
+                table = {k: revive(v) for k, v in node['$table']['columns'].items()}
+                return [{k: table[k][i] for k in table} for i in range(node['$table']['length'])]
+            return {k: revive(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [revive(v) for v in node]
+        return node
+
+    return revive(header['doc'])
@@ -1,199 +1,762 @@
+import time
+import warnings
+
 import numpy as np
+import scipy.sparse as sp
+from scipy.linalg import lu_factor, lu_solve, cholesky, eigh, LinAlgError, LinAlgWarning
+from scipy.sparse.linalg import splu, eigsh, LinearOperator
+from load_cases import parse_cases, combination_matrix, min_max
+from solver_cache import structure_key
+from metrics import timed
+from model_arrays import ColumnTable, columns, last_unique, lookup
+from assembly import (frame_geometry, frame_local_stiffness, frame_local_mass, frame_local_geometric,
+                      frame_rotation, to_global, element_dofs, scatter)
+
+# With method='auto', models above this many DOFs use the sparse path.
+# Below it the dense solve is faster than setting up a sparse factorization.
+SPARSE_DOF_THRESHOLD = 300
+
+# Eigenproblems up to this many free DOFs are solved densely; larger ones with
+# shift-invert Lanczos (ARPACK) on the existing factorization
+DENSE_EIGEN_LIMIT = 500
+
+# Model storage: one array per field (see model_arrays.ColumnTable)
+NODE_FIELDS = {'id': np.int64, 'x': float, 'y': float}
+# m: mass per unit length, NaN for rho * A
+ELEMENT_FIELDS = {'id': np.int64, 'n1': np.int64, 'n2': np.int64, 'E': float, 'A': float, 'I': float, 'm': float}
+SUPPORT_FIELDS = {'node': np.int64, 'u': bool, 'v': bool, 'theta': bool}
+LOAD_FIELDS = {'node': np.int64, 'fx': float, 'fy': float, 'm': float}
+# Support type -> restrained (u, v, theta)
+# A low-rank update whose capacitance matrix I + U^T Z D is worse conditioned
+# than this, or whose solve leaves a larger relative residual than
+# UPDATE_RESIDUAL_TOLERANCE, is abandoned for a full factorization: the updated
+# matrix is (nearly) singular or the update has lost too much accuracy.
+UPDATE_MAX_CONDITION = 1e10
+UPDATE_RESIDUAL_TOLERANCE = 1e-8
+
+SUPPORT_TYPES = {
+    'pin': (True, True, False),
+    'fixed': (True, True, True),
+    'roller': (False, True, False) # Standard roller on ground: fixed Y, free X and theta
+}
+
+
+def _factorize_dense(K_ff):
+    # LU factorization; returns a function solving K_ff x = b for one or
+    # more right-hand sides
+    if K_ff.shape[0] == 0:
+        # Every DOF is restrained
+        return lambda b: np.zeros(np.shape(b))
+    with warnings.catch_warnings():
+        # lu_factor warns instead of raising on an exactly singular matrix
+        warnings.simplefilter('ignore', LinAlgWarning)
+        lu, piv = lu_factor(K_ff)
+    if np.any(np.diag(lu) == 0):
+        raise ValueError("Structure is unstable.")
+    
+    def solve(b):
+        return lu_solve((lu, piv), b)
+    solve.nbytes = lu.nbytes + piv.nbytes
+    return solve
+
+
+def _factorize_sparse(K_ff):
+    # SuperLU in symmetric mode: diagonal pivots only, with a minimum degree
+    # fill-reducing ordering computed on A + A^T. (A reverse Cuthill-McKee
+    # renumbering beforehand only adds work: SuperLU reorders anyway, and on a
+    # 20k-node grid the fill came out higher with it than without.)
+    if K_ff.shape[0] == 0:
+        return lambda b: np.zeros(np.shape(b))
+    try:
+        lu = splu(sp.csc_matrix(K_ff), permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.0,
+                  options={'SymmetricMode': True})
+    except RuntimeError:
+        # SuperLU reports "Factor is exactly singular"
+        raise ValueError("Structure is unstable.")
+
+    def solve(b):
+        x = lu.solve(np.asarray(b, dtype=float))
+        if not np.all(np.isfinite(x)):
+            raise ValueError("Structure is unstable.")
+        return x
+    # Factors hold nnz values (8 bytes) and row indices (4 bytes) each
+    solve.nbytes = 12 * lu.nnz + lu.perm_r.nbytes + lu.perm_c.nbytes
+    return solve
+
+
+def _factorize_update(factor, dK_ff, max_rank):
+    # Solve (K_ff + dK_ff) x = b reusing the factorization of K_ff (Woodbury).
+    # dK_ff is nonzero only in the rows/columns P, so dK_ff = U D U^T with U the
+    # columns of I selected by P and D = dK_ff[P, P]; then with y = K_ff^-1 b and
+    # Z = K_ff^-1 U:  x = y - Z D (I + U^T Z D)^-1 U^T y.
+    # Returns (solve, rank), or None when more than max_rank DOFs are touched or the
+    # capacitance matrix is too ill-conditioned (see UPDATE_MAX_CONDITION).
+    dK_ff = sp.csr_matrix(dK_ff)
+    dK_ff.eliminate_zeros()
+    P = np.union1d(*dK_ff.nonzero())
+    rank = len(P)
+    if rank == 0:
+        return factor, 0
+    if rank > max_rank:
+        return None
+    
+    U = np.zeros((dK_ff.shape[0], rank))
+    U[P, np.arange(rank)] = 1.0
+    Z = factor(U)
+    D = dK_ff[P][:, P].toarray()
+    capacitance = np.eye(rank) + Z[P] @ D
+    if not np.linalg.cond(capacitance) <= UPDATE_MAX_CONDITION:
+        return None
+    lu, piv = lu_factor(capacitance)
+    ZD = Z @ D
+
+    def solve(b):
+        y = factor(b)
+        return y - ZD @ lu_solve((lu, piv), y[P])
+    return solve, rank
+
+
+def _positive_definite(K_ff):
+    # Cholesky for dense matrices; for sparse ones the signs of U's diagonal in a
+    # symmetric (diagonal pivot) factorization, which equal those of D in L D L^T
+    if K_ff.shape[0] == 0:
+        return True
+    if not sp.issparse(K_ff):
+        try:
+            cholesky(K_ff)
+            return True
+        except LinAlgError:
+            return False
+    try:
+        lu = splu(K_ff.tocsc(), permc_spec='MMD_AT_PLUS_A', diag_pivot_thresh=0.0,
+                  options={'SymmetricMode': True})
+    except RuntimeError:
+        return False
+    if not np.array_equal(lu.perm_r, lu.perm_c):
+        # Off-diagonal pivots were needed: certainly not positive definite
+        return False
+    return bool(np.all(lu.U.diagonal() > 0))
+
+
+def _lowest_modes(K_ff, M_ff, factor, k):
+    # Lowest k eigenpairs of K x = lam M x, eigenvectors M-orthonormal.
+    # Shift-invert about 0 needs only solves with K, i.e. the static factorization.
+    n = K_ff.shape[0]
+    if n <= DENSE_EIGEN_LIMIT or k >= n - 1:
+        K = K_ff.toarray() if sp.issparse(K_ff) else K_ff
+        M = M_ff.toarray() if sp.issparse(M_ff) else M_ff
+        try:
+            lam, phi = eigh(K, M, subset_by_index=[0, k - 1])
+        except LinAlgError:
+            raise ValueError("Mass matrix is singular: every free degree of freedom needs mass.")
+    else:
+        OPinv = LinearOperator((n, n), matvec=factor, matmat=factor, dtype=float)
+        lam, phi = eigsh(K_ff, k=k, M=M_ff, sigma=0.0, which='LM', OPinv=OPinv)
+    order = np.argsort(lam)
+    return lam[order], phi[:, order]
+
+
+def _largest_modes(A_ff, B_ff, factor, k):
+    # Largest k eigenpairs of A x = mu B x with B = K (positive definite, factored)
+    n = A_ff.shape[0]
+    if n <= DENSE_EIGEN_LIMIT or k >= n - 1:
+        A = A_ff.toarray() if sp.issparse(A_ff) else A_ff
+        B = B_ff.toarray() if sp.issparse(B_ff) else B_ff
+        mu, phi = eigh(A, B, subset_by_index=[n - k, n - 1])
+    else:
+        Binv = LinearOperator((n, n), matvec=factor, matmat=factor, dtype=float)
+        mu, phi = eigsh(A_ff, k=k, M=B_ff, Minv=Binv, which='LA')
+    order = np.argsort(mu)[::-1]
+    return mu[order], phi[:, order]
+
 
 class FrameSolver:
-    def __init__(self):
-        self.nodes = {} # id -> {x, y}
-        self.elements = [] # {id, n1, n2, E, A, I}
-        self.supports = {} # node_id -> {fix_x, fix_y, fix_m} (bools)
-        self.loads = [] # {node: id, fx: val, fy: val, m: val}
+    def __init__(self, cache=None):
+        # Optional solver_cache.LRUCache shared between solvers: reuses K and its
+        # factorization when only the loads change between solves
+        self.cache = cache
+        # Wall time per phase (seconds) and model size of the last solve
+        self.timings = {}
+        self.sizes = {}
+        # Model arrays. A later node or support with the same id replaces the earlier one.
+        self.nodes = ColumnTable(**NODE_FIELDS)
+        self.elements = ColumnTable(**ELEMENT_FIELDS)
+        self.supports = ColumnTable(**SUPPORT_FIELDS)
+        self.loads = ColumnTable(**LOAD_FIELDS)
         # For distributed loads on members, we would need more complex equivalent nodal force logic
-        
+
+    @classmethod
+    def from_arrays(cls, nodes, elements, supports=(), loads=(), cache=None):
+        # Bulk constructor. Each section is a list of records or a mapping of
+        # equal-length columns (see model_arrays.columns):
+        #   nodes: id, x, y                 elements: id, n1, n2, E, A, I, optional m
+        #   supports: node, type            loads: node, fx, fy, m
+        solver = cls(cache=cache)
+        solver.nodes.extend(columns(nodes, NODE_FIELDS))
+        solver.elements.extend(columns(elements, ELEMENT_FIELDS, defaults={'m': np.nan}))
+        s = columns(supports, {'node': np.int64, 'type': object})
+        known = np.array([t in SUPPORT_TYPES for t in s['type']], dtype=bool)
+        flags = np.array([SUPPORT_TYPES[t] for t in s['type'][known]], dtype=bool).reshape(-1, 3)
+        solver.supports.extend({'node': s['node'][known], 'u': flags[:, 0], 'v': flags[:, 1], 'theta': flags[:, 2]})
+        solver.loads.extend(columns(loads, LOAD_FIELDS))
+        return solver
+
     def add_node(self, id, x, y):
-        self.nodes[int(id)] = {'x': float(x), 'y': float(y)}
-        
-    def add_element(self, id, n1, n2, E, A, I):
-        self.elements.append({
-            'id': int(id),
-            'n1': int(n1),
-            'n2': int(n2),
-            'E': float(E),
-            'A': float(A),
-            'I': float(I)
-        })
-        
+        self.nodes.append(id=int(id), x=float(x), y=float(y))
+
+    def add_element(self, id, n1, n2, E, A, I, m=None):
+        # m: mass per unit length (kg/m), only used by modal(); defaults to rho * A there
+        self.elements.append(id=int(id), n1=int(n1), n2=int(n2), E=float(E), A=float(A), I=float(I),
+                             m=np.nan if m is None else float(m))
+
     def add_support(self, node_id, type):
-        # Types: 'pin', 'roller_x' (rolls on X, fixed Y), 'roller_y' (rolls on Y, fixed X), 'fixed'
-        nid = int(node_id)
-        if type == 'pin':
-            self.supports[nid] = {'u': True, 'v': True, 'theta': False}
-        elif type == 'fixed':
-            self.supports[nid] = {'u': True, 'v': True, 'theta': True}
-        elif type == 'roller': # Assume standard roller on ground (fixed Y, free X, free theta)
-            self.supports[nid] = {'u': False, 'v': True, 'theta': False}
-            
+        # Types: see SUPPORT_TYPES; others are ignored
+        flags = SUPPORT_TYPES.get(type)
+        if flags is not None:
+            self.supports.append(node=int(node_id), u=flags[0], v=flags[1], theta=flags[2])
+
     def add_load(self, node_id, fx, fy, m):
-        self.loads.append({
-            'node': int(node_id),
-            'fx': float(fx),
-            'fy': float(fy),
-            'm': float(m)
-        })
-
-    def solve(self):
-        # DOF mapping: Node i -> 3*i, 3*i+1, 3*i+2 (u, v, theta)
-        # We need a mapping from User Node ID -> Matrix Index
-        sorted_node_ids = sorted(self.nodes.keys())
-        node_map = {nid: i for i, nid in enumerate(sorted_node_ids)}
-        num_nodes = len(sorted_node_ids)
-        num_dof = 3 * num_nodes
+        self.loads.append(node=int(node_id), fx=float(fx), fy=float(fy), m=float(m))
+
+    def solve(self, method='auto', member_points=0):
+        # method: 'dense' (LU factorization of the full matrix), 'sparse'
+        # (CSR assembly + sparse factorization) or 'auto' (by model size)
+        # member_points: if >= 2, N/V/M are also sampled at this many points along each member
+        self.timings = {}
+        node_map = self._node_map()
+        self._record_sizes(len(self.loads))
+        structure = self._structure(node_map, method)
+        with timed(self.timings, 'load_vector'):
+            F_global = self._load_vector(node_map, self.loads)
         
-        K_global = np.zeros((num_dof, num_dof))
-        F_global = np.zeros(num_dof)
+        with timed(self.timings, 'solve'):
+            d_global, R_global = self._solve_dofs(structure, F_global)
+        with timed(self.timings, 'format'):
+            return self._format_results(node_map, d_global, R_global, structure[3], member_points)
+
+    def solve_cases(self, cases, combinations=(), method='auto', member_points=0):
+        # Solve several load cases on the same frame with one factorization.
+        # cases: [{'name': str, 'loads': [{'node', 'fx', 'fy', 'm'}] or {'node': [...], ...}}]
+        # combinations: [{'name': str, 'factors': {case_name: factor}}]
+        # Loads added with add_load are not used here; each case brings its own.
+        self.timings = {}
+        names, case_loads = parse_cases(cases, self._case_loads)
+        C = combination_matrix(names, combinations)
         
-        # Assemble Stiffness
-        for elem in self.elements:
-            n1_id = elem['n1']
-            n2_id = elem['n2']
-            
-            idx1 = node_map[n1_id]
-            idx2 = node_map[n2_id]
-            
-            x1, y1 = self.nodes[n1_id]['x'], self.nodes[n1_id]['y']
-            x2, y2 = self.nodes[n2_id]['x'], self.nodes[n2_id]['y']
-            
-            L = np.sqrt((x2-x1)**2 + (y2-y1)**2)
-            if L == 0: continue
-            
-            dx = x2 - x1
-            dy = y2 - y1
-            c = dx / L # cos
-            s = dy / L # sin
-            
-            E = elem['E']
-            A = elem['A']
-            I = elem['I']
-            
-            # Local stiffness matrix k' (6x6)
-            # u1, v1, th1, u2, v2, th2
-            k_local = np.zeros((6, 6))
-            
-            # Axial terms (EA/L)
-            k_local[0,0] = k_local[3,3] = E*A/L
-            k_local[0,3] = k_local[3,0] = -E*A/L
-            
-            # Bending terms
-            k1 = 12*E*I/L**3
-            k2 = 6*E*I/L**2
-            k3 = 4*E*I/L
-            k4 = 2*E*I/L
-            
-            # v1, th1, v2, th2 correspond to indices 1, 2, 4, 5
-            k_local[1,1] = k_local[4,4] = k1
-            k_local[1,4] = k_local[4,1] = -k1
-            
-            k_local[1,2] = k_local[2,1] = k2
-            k_local[1,5] = k_local[5,1] = k2
-            
-            k_local[4,2] = k_local[2,4] = -k2
-            k_local[4,5] = k_local[5,4] = -k2
-            
-            k_local[2,2] = k_local[5,5] = k3
-            k_local[2,5] = k_local[5,2] = k4
-            
-            # Rotation Matrix T (6x6)
-            # [ c  s  0  0  0  0]
-            # [-s  c  0  0  0  0]
-            # [ 0  0  1  0  0  0]
-            # ...
-            T = np.zeros((6, 6))
-            T[0,0] = T[1,1] = c
-            T[0,1] = s
-            T[1,0] = -s
-            T[2,2] = 1
-            T[3,3] = T[4,4] = c
-            T[3,4] = s
-            T[4,3] = -s
-            T[5,5] = 1
-            
-            # Global Element Stiffness
-            k_global_elem = T.T @ k_local @ T
-            
-            # Add to global K
-            # DOF indices for n1 and n2
-            # n1: 3*idx1, 3*idx1+1, 3*idx1+2
-            # n2: 3*idx2, 3*idx2+1, 3*idx2+2
-            dofs = [3*idx1, 3*idx1+1, 3*idx1+2, 3*idx2, 3*idx2+1, 3*idx2+2]
-            
-            for i in range(6):
-                for j in range(6):
-                    K_global[dofs[i], dofs[j]] += k_global_elem[i, j]
-
-        # Apply Loads
-        for load in self.loads:
-            nid = load['node']
-            if nid in node_map:
-                idx = node_map[nid]
-                F_global[3*idx] += load['fx']
-                F_global[3*idx+1] += load['fy']
-                F_global[3*idx+2] += load['m']
-
-        # Apply Supports
-        fixed_dofs = []
-        for nid, constraints in self.supports.items():
-            if nid in node_map:
-                idx = node_map[nid]
-                if constraints['u']: fixed_dofs.append(3*idx)
-                if constraints['v']: fixed_dofs.append(3*idx+1)
-                if constraints['theta']: fixed_dofs.append(3*idx+2)
-        
-        fixed_dofs = sorted(list(set(fixed_dofs)))
-        free_dofs = [i for i in range(num_dof) if i not in fixed_dofs]
-        
-        # Solve
-        K_ff = K_global[np.ix_(free_dofs, free_dofs)]
-        F_f = F_global[free_dofs]
+        node_map = self._node_map()
+        self._record_sizes(sum(len(loads['node']) for loads in case_loads), cases=len(names))
+        structure = self._structure(node_map, method)
+        with timed(self.timings, 'load_vector'):
+            F_global = np.column_stack([self._load_vector(node_map, loads) for loads in case_loads])
         
-        try:
-            d_f = np.linalg.solve(K_ff, F_f)
-        except np.linalg.LinAlgError:
-            raise ValueError("Structure is unstable.")
+        # All right-hand sides go through the same factorization in one call
+        with timed(self.timings, 'solve'):
+            d_global, R_global = self._solve_dofs(structure, F_global)
+        
+        members = structure[3]
+        results = {
+            'cases': {name: self._format_results(node_map, d_global[:, j], R_global[:, j], members, member_points)
+                      for j, name in enumerate(names)},
+            'combinations': {}
+        }
+        if C.shape[1]:
+            # Linear analysis: combinations are weighted sums of the case results
+            d_global, R_global = d_global @ C, R_global @ C
+            results['combinations'] = {
+                combo['name']: self._format_results(node_map, d_global[:, j], R_global[:, j], members, member_points)
+                for j, combo in enumerate(combinations)
+            }
+        f = self._member_forces(members, d_global)
+
+        # Envelope over the combinations if any were given, else over the cases
+        _, supported = self._restraints(node_map)
+        d = min_max(d_global.reshape(-1, 3, d_global.shape[1]))
+        R = min_max(R_global.reshape(-1, 3, R_global.shape[1])[supported])
+        f = min_max(f)
+
+        def pairs(env, i, k):
+            return {'min': env['min'][i][k], 'max': env['max'][i][k]}
+        results['envelope'] = {
+            'nodes': [{
+                'id': nid,
+                **{key: pairs(d, i, k) for k, key in enumerate(('u', 'v', 'theta'))}
+            } for i, nid in enumerate(node_map['ids'].tolist())],
+            'reactions': [{
+                'node': nid,
+                **{key: pairs(R, i, k) for k, key in enumerate(('Rx', 'Ry', 'Mz'))}
+            } for i, nid in enumerate(node_map['ids'][supported].tolist())],
+            'elements': [{
+                'id': eid,
+                **{key: pairs(f, i, k) for k, key in enumerate(('N1', 'V1', 'M1', 'N2', 'V2', 'M2'))}
+            } for i, eid in enumerate(self.elements['id'].tolist())]
+        }
+        return results
+
+    def solve_reusing(self, previous=None, method='auto', max_rank=64, member_points=0):
+        # Static solve that reuses the factorization of an earlier, related model.
+        # previous: the state returned by an earlier call (or None). Returns
+        # (results, state, info) with info['update'] one of
+        #   'loads'    - K unchanged, the previous factorization is reused as is
+        #   'low_rank' - same nodes and supports, K changed in at most max_rank DOFs:
+        #                Woodbury update of the last fully factorized K
+        #   'full'     - new factorization (becomes the base for later updates)
+        self.timings = {}
+        node_map = self._node_map()
+        self._record_sizes(len(self.loads))
+        key = self._structure_key(method)
+        # Nodes and restraints fix the free-DOF partition; a low-rank update needs it unchanged
+        partition = (node_map['ids'].tobytes(), self._restraints(node_map)[0].tobytes())
+        info = {'update': 'full', 'rank': 0}
+        
+        structure = None
+        state = dict(previous) if previous is not None else None
+        if state is not None and state['key'] == key:
+            structure = state['structure']
+            info['update'] = 'loads'
+        elif state is not None and state['partition'] == partition:
+            K_base, _, base_factor, _ = state['base']
+            with timed(self.timings, 'assemble'):
+                K_global, free_dofs, sparse, members = self._assemble(
+                    node_map, 'sparse' if sp.issparse(K_base) else 'dense')
+            with timed(self.timings, 'factorize'):
+                dK_ff = self._free_block(K_global - K_base, free_dofs)
+                update = _factorize_update(base_factor, dK_ff, max_rank)
+            if update is not None:
+                structure = (K_global, free_dofs, update[0], members)
+                info = {'update': 'low_rank', 'rank': update[1]}
+        
+        if structure is None:
+            structure = self._structure(node_map, method)
+            state = {'base': structure, 'partition': partition}
+        state['key'] = key
+        state['structure'] = structure
+        
+        with timed(self.timings, 'load_vector'):
+            F_global = self._load_vector(node_map, self.loads)
+        with timed(self.timings, 'solve'):
+            d_global, R_global = self._solve_dofs(structure, F_global)
+        if info['update'] == 'low_rank':
+            # The residual of an exact solve vanishes at the free DOFs; otherwise
+            # solve again with a fresh factorization, which also reports a mechanism
+            free_dofs = structure[1]
+            residual = np.abs(R_global[free_dofs]).max(initial=0.0)
+            if not residual <= UPDATE_RESIDUAL_TOLERANCE * np.abs(F_global[free_dofs]).max(initial=0.0):
+                structure = self._structure(node_map, method)
+                state = {'base': structure, 'partition': partition, 'key': key, 'structure': structure}
+                info = {'update': 'full', 'rank': 0}
+                with timed(self.timings, 'solve'):
+                    d_global, R_global = self._solve_dofs(structure, F_global)
+        with timed(self.timings, 'format'):
+            results = self._format_results(node_map, d_global, R_global, structure[3], member_points)
+        return results, state, info
+
+    def modal(self, num_modes=6, mass='consistent', rho=7850.0, method='auto', max_nodes=2000):
+        # Natural frequencies and mode shapes of the lowest num_modes modes.
+        # mass: 'consistent' or 'lumped' element mass matrices; rho: density (kg/m^3)
+        # for members without their own mass per length. Mode shapes are scaled to a
+        # largest nodal translation of 1 and reported for at most max_nodes nodes.
+        if mass not in ('consistent', 'lumped'):
+            raise ValueError(f"Unknown mass matrix type: {mass}")
+        self.timings = {}
+        node_map = self._node_map()
+        self._record_sizes(0)
+        K_global, free_dofs, factor, members = self._structure(node_map, method)
+        num_dof = 3 * len(node_map['ids'])
+        if len(free_dofs) == 0:
+            raise ValueError("Structure has no free degrees of freedom.")
+        
+        with timed(self.timings, 'mass'):
+            m = np.where(np.isnan(self.elements['m']), rho * self.elements['A'], self.elements['m'])
+            m_local = frame_local_mass(members['L'], m, lumped=mass == 'lumped')
+            M_global = scatter(to_global(m_local, members['T']), members['dofs'], num_dof, sp.issparse(K_global))
+            M_ff = self._free_block(M_global, free_dofs)
+        
+        k = min(int(num_modes), len(free_dofs))
+        with timed(self.timings, 'eigensolve'):
+            lam, phi = _lowest_modes(self._free_block(K_global, free_dofs), M_ff, factor, k)
+        lam = np.maximum(lam, 0.0)
+        omega = np.sqrt(lam)
+        
+        with timed(self.timings, 'format'):
+            # Effective modal mass per direction: (phi^T M r)^2 / (phi^T M phi)
+            participation = {}
+            total_mass = {}
+            for axis, offset in (('x', 0), ('y', 1)):
+                r = (free_dofs % 3 == offset).astype(float)
+                Mr = M_ff @ r
+                total_mass[axis] = float(r @ Mr)
+                gamma = phi.T @ Mr
+                modal_mass = np.einsum('ij,ij->j', phi, M_ff @ phi)
+                participation[axis] = gamma**2 / modal_mass / total_mass[axis] if total_mass[axis] > 0 else np.zeros(k)
             
+            node_ids, shapes = self._mode_shapes(node_map, free_dofs, phi, max_nodes)
+            return {
+                'modes': [{
+                    'mode': i + 1,
+                    'omega': omega[i],
+                    'frequency': omega[i] / (2 * np.pi),
+                    'period': 2 * np.pi / omega[i] if omega[i] > 0 else None,
+                    'participation': {'x': participation['x'][i], 'y': participation['y'][i]}
+                } for i in range(k)],
+                'total_mass': total_mass,
+                'node_ids': node_ids,
+                'shapes': shapes
+            }
+
+    def buckling(self, num_modes=4, method='auto', max_nodes=2000):
+        # Linear (eigenvalue) buckling under the current loads as reference loads:
+        # (K + lam Kg) phi = 0 with Kg from the member axial forces of a static solve.
+        # Solved as -Kg phi = mu K phi for the largest mu = 1 / lam, which needs only
+        # the static factorization. Also reports, for every compressed member, its
+        # critical force at the first mode and the effective length factor
+        # K = pi / L * sqrt(EI / P_cr) implied by it (cf. PillarSolver). L is the
+        # element length: for a column split into several elements, rescale by
+        # element length / column length.
+        self.timings = {}
+        node_map = self._node_map()
+        self._record_sizes(len(self.loads))
+        structure = self._structure(node_map, method)
+        K_global, free_dofs, factor, members = structure
+        num_dof = 3 * len(node_map['ids'])
+        if len(free_dofs) == 0:
+            raise ValueError("Structure has no free degrees of freedom.")
+        
+        with timed(self.timings, 'solve'):
+            d_global, _ = self._solve_dofs(structure, self._load_vector(node_map, self.loads))
+            N = -self._member_forces(members, d_global)[:, 0] # tension positive
+        if not np.any(N < -1e-9 * max(np.abs(N).max(), 1.0)):
+            raise ValueError("Reference loads produce no compression; nothing can buckle.")
+        
+        with timed(self.timings, 'geometric'):
+            Kg, _ = self._geometric_stiffness(members, N, num_dof, sp.issparse(K_global))
+            Kg_ff = self._free_block(Kg, free_dofs)
+        
+        K_ff = self._free_block(K_global, free_dofs)
+        k = min(int(num_modes), len(free_dofs))
+        with timed(self.timings, 'eigensolve'):
+            mu, phi = _largest_modes(-Kg_ff, K_ff, factor, k)
+        positive = mu > 1e-12 * max(np.abs(mu).max(), 1e-300)
+        if not np.any(positive):
+            raise ValueError("No buckling mode found for these reference loads.")
+        load_factors = 1.0 / mu[positive]
+        phi = phi[:, positive]
+        
+        with timed(self.timings, 'format'):
+            node_ids, shapes = self._mode_shapes(node_map, free_dofs, phi, max_nodes)
+            P_cr = load_factors[0] * -N
+            rows = np.flatnonzero((N < 0) & (members['L'] > 0))
+            L = members['L'][rows]
+            K_eff = np.pi / L * np.sqrt(self.elements['E'][rows] * self.elements['I'][rows] / P_cr[rows])
+            member_rows = [{
+                'id': eid, 'N': n, 'L': l, 'P_cr': p, 'K_eff': k
+            } for eid, n, l, p, k in zip(self.elements['id'][rows].tolist(), N[rows].tolist(),
+                                         L.tolist(), P_cr[rows].tolist(), K_eff.tolist())]
+            return {
+                'load_factors': load_factors.tolist(),
+                'modes': [{'mode': i + 1, 'load_factor': lf} for i, lf in enumerate(load_factors)],
+                'members': member_rows,
+                'node_ids': node_ids,
+                'shapes': shapes
+            }
+
+    def p_delta(self, tol=1e-6, max_iter=30, method='auto', member_points=0):
+        # Second-order (P-Delta) static analysis: solves (K + Kg(N(d))) d = F, where
+        # member axial forces N depend on the displacements. Modified Newton: the
+        # correction for residual r is K_t^-1 r with the last factorized tangent K_t,
+        # which starts as the linear K (usually from the cache). The tangent is only
+        # refactored when convergence stalls. Converged when ||W r|| <= tol * ||W F||
+        # over the free DOFs, with W = diag(K)^-1/2: each force or moment is
+        # measured against its own DOF's stiffness, so residuals in stiff axial
+        # DOFs do not swamp those in sway and rotation.
+        self.timings = {}
+        node_map = self._node_map()
+        self._record_sizes(len(self.loads))
+        structure = self._structure(node_map, method)
+        K_global, free_dofs, factor, members = structure
+        num_dof = 3 * len(node_map['ids'])
+        sparse = sp.issparse(K_global)
+        
+        F_global = self._load_vector(node_map, self.loads)
+        diag = K_global.diagonal()[free_dofs] if sparse else np.diag(K_global)[free_dofs]
+        weight = 1.0 / np.sqrt(np.where(diag > 0, diag, 1.0))
+        F_norm = np.linalg.norm(weight * F_global[free_dofs])
         d_global = np.zeros(num_dof)
+        history = []
+        converged = False
+        linear = None
+        last_norm = None
+        for iteration in range(1, int(max_iter) + 1):
+            start = time.perf_counter()
+            N = -self._member_forces(members, d_global)[:, 0]
+            Kg, kg_local = self._geometric_stiffness(members, N, num_dof, sparse)
+            K_t = K_global + Kg
+            r = (F_global - K_t @ d_global)[free_dofs]
+            norm = np.linalg.norm(weight * r)
+            refactored = False
+            
+            if norm <= tol * F_norm:
+                converged = True
+                history.append({'iteration': iteration, 'residual': norm / F_norm if F_norm else 0.0,
+                                'refactored': False, 'time': time.perf_counter() - start})
+                break
+            if last_norm is not None and norm > 0.5 * last_norm:
+                # Slow or no contraction with the old tangent: refactor at the current state
+                with timed(self.timings, 'factorize'):
+                    factor = (_factorize_sparse if sparse else _factorize_dense)(self._free_block(K_t, free_dofs))
+                refactored = True
+            with timed(self.timings, 'solve'):
+                d_global[free_dofs] += factor(r)
+            if linear is None:
+                linear = d_global.copy()
+            last_norm = norm
+            history.append({'iteration': iteration, 'residual': norm / F_norm if F_norm else 0.0,
+                            'refactored': refactored, 'time': time.perf_counter() - start})
+        
+        if not converged:
+            raise ValueError(f"P-Delta analysis did not converge in {int(max_iter)} iterations "
+                             f"(loads may exceed the buckling load).")
+        with timed(self.timings, 'stability'):
+            # An equilibrium with an indefinite tangent lies beyond the critical
+            # load: the structure would have buckled on the way there
+            if not _positive_definite(self._free_block(K_t, free_dofs)):
+                raise ValueError("P-Delta analysis: the loads exceed the buckling load.")
+        
+        with timed(self.timings, 'format'):
+            # End forces include the geometric stiffness at the converged axial forces
+            members = dict(members, kT=(members['k_local'] + kg_local) @ members['T'])
+            R_global = K_t @ d_global - F_global
+            results = self._format_results(node_map, d_global, R_global, members, member_points)
+            # Second-order / first-order ratio of the largest displacement of each DOF
+            # type; 'amplification' is the sway (horizontal translation) ratio
+            if linear is None:
+                linear = d_global
+            ratios = {}
+            for name, offset in (('u', 0), ('v', 1), ('theta', 2)):
+                dofs = free_dofs[free_dofs % 3 == offset]
+                first = np.abs(linear[dofs]).max() if len(dofs) else 0.0
+                ratios[name] = float(np.abs(d_global[dofs]).max() / first) if first > 0 else 1.0
+            results['p_delta'] = {
+                'converged': True,
+                'iterations': history,
+                'amplification': ratios['u'],
+                'amplification_by_dof': ratios
+            }
+        return results
+
+    def _geometric_stiffness(self, members, N, num_dof, sparse):
+        # Global geometric stiffness for member axial forces N (tension positive),
+        # and the local element matrices
+        L = members['L']
+        kg_local = frame_local_geometric(np.where(L > 0, L, 1.0), np.where(L > 0, N, 0.0))
+        Kg = scatter(to_global(kg_local, members['T']), members['dofs'], num_dof, sparse)
+        return Kg, kg_local
+
+    def _mode_shapes(self, node_map, free_dofs, phi, max_nodes):
+        # Mode shapes scaled to a largest nodal translation of 1, for at most
+        # max_nodes evenly strided nodes: (node ids, [{'u', 'v', 'theta'} per mode])
+        num_dof = 3 * len(node_map['ids'])
+        shapes = np.zeros((num_dof, phi.shape[1]))
+        shapes[free_dofs] = phi
+        translations = np.abs(np.concatenate([shapes[0::3], shapes[1::3]]))
+        scale = translations.max(axis=0) if len(translations) else np.ones(phi.shape[1])
+        shapes /= np.where(scale > 0, scale, 1.0)
+        
+        node_ids = node_map['ids']
+        stride = max(1, -(-len(node_ids) // max(1, int(max_nodes))))
+        picked = np.arange(0, len(node_ids), stride)
+        return node_ids[picked].tolist(), [{
+            'u': shapes[3 * picked, i].tolist(),
+            'v': shapes[3 * picked + 1, i].tolist(),
+            'theta': shapes[3 * picked + 2, i].tolist()
+        } for i in range(phi.shape[1])]
+
+    def _record_sizes(self, num_loads, cases=1):
+        self.sizes = {
+            'dofs': 3 * len(self.nodes),
+            'elements': len(self.elements),
+            'loads': num_loads,
+            'cases': cases
+        }
+
+    def _case_loads(self, case):
+        return columns(case.get('loads', []), LOAD_FIELDS)
+
+    def _node_map(self):
+        # DOF mapping: the i-th node in id order owns DOFs 3*i, 3*i+1, 3*i+2 (u, v, theta).
+        # Returns the sorted node ids and their coordinates.
+        last = last_unique(self.nodes['id'])
+        return {'ids': self.nodes['id'][last], 'x': self.nodes['x'][last], 'y': self.nodes['y'][last]}
+
+    def _restraints(self, node_map):
+        # Restrained DOFs per node (n_nodes, 3) and a mask of the nodes that have a
+        # support. Supports at unknown nodes are ignored.
+        s = self.supports
+        last = last_unique(s['node'])
+        idx, found = lookup(node_map['ids'], s['node'][last])
+        flags = np.stack([s['u'], s['v'], s['theta']], axis=1)[last]
+        fixed = np.zeros((len(node_map['ids']), 3), dtype=bool)
+        fixed[idx[found]] = flags[found]
+        supported = np.zeros(len(node_map['ids']), dtype=bool)
+        supported[idx[found]] = True
+        return fixed, supported
+
+    def _structure(self, node_map, method):
+        # (K_global, free_dofs, factorization of K_ff, member arrays), from the cache when the
+        # geometry, sections and supports match an earlier solve
+        key = None
+        if self.cache is not None:
+            key = self._structure_key(method)
+            structure = self.cache.get(key)
+            if structure is not None:
+                return structure
+        
+        with timed(self.timings, 'assemble'):
+            K_global, free_dofs, sparse, members = self._assemble(node_map, method)
+        with timed(self.timings, 'factorize'):
+            factor = (_factorize_sparse if sparse else _factorize_dense)(self._free_block(K_global, free_dofs))
+        structure = (K_global, free_dofs, factor, members)
+        
+        if key is not None:
+            self.cache.put(key, structure)
+        return structure
+
+    def _structure_key(self, method):
+        # Geometry, sections and supports: everything K depends on. Elements are
+        # hashed in order, since the cached member arrays follow that order.
+        node_map = self._node_map()
+        e = self.elements
+        return structure_key(
+            'frame', method,
+            node_map['ids'], node_map['x'], node_map['y'],
+            e['id'], e['n1'], e['n2'], e['E'], e['A'], e['I'],
+            self._restraints(node_map)[0]
+        )
+
+    @staticmethod
+    def _free_block(K_global, free_dofs):
+        if sp.issparse(K_global):
+            return K_global[free_dofs][:, free_dofs]
+        return K_global[np.ix_(free_dofs, free_dofs)]
+
+    def _assemble(self, node_map, method):
+        # Returns (K_global, free_dofs, sparse, members)
+        num_nodes = len(node_map['ids'])
+        num_dof = 3 * num_nodes
+        
+        if method == 'auto':
+            method = 'sparse' if num_dof > SPARSE_DOF_THRESHOLD else 'dense'
+        if method not in ('dense', 'sparse'):
+            raise ValueError(f"Unknown solve method: {method}")
+        sparse = method == 'sparse'
+        
+        # All elements at once as (n, 6, 6) stacks, then a single scatter into the global matrix
+        members = self._members(node_map)
+        k_elem = to_global(members['k_local'], members['T'])
+        K_global = scatter(k_elem, members['dofs'], num_dof, sparse)
+
+        # Apply Supports: boolean mask over the DOFs (node-major, like the DOF numbering)
+        fixed = self._restraints(node_map)[0].ravel()
+        free_dofs = np.flatnonzero(~fixed)
+        return K_global, free_dofs, sparse, members
+
+    def _members(self, node_map):
+        # Stacked element data: ids, global DOF numbers (n, 6), lengths, local
+        # stiffness and global->local rotation (n, 6, 6), and their product k T,
+        # which maps element displacements to local end forces.
+        # Zero-length members get zero matrices: no stiffness and no forces.
+        e = self.elements
+        n = len(e)
+        idx1, found1 = lookup(node_map['ids'], e['n1'])
+        idx2, found2 = lookup(node_map['ids'], e['n2'])
+        missing = ~(found1 & found2)
+        if missing.any():
+            raise ValueError(f"Element {e['id'][missing][0]} references a missing node")
+        x, y = node_map['x'], node_map['y']
+        L, c, s = frame_geometry(x[idx1], y[idx1], x[idx2], y[idx2])
+
+        keep = L > 0
+        k_local = np.zeros((n, 6, 6))
+        T = np.zeros((n, 6, 6))
+        k_local[keep] = frame_local_stiffness(L[keep], e['E'][keep], e['A'][keep], e['I'][keep])
+        T[keep] = frame_rotation(c[keep], s[keep])
+        return {
+            'ids': e['id'].copy(),
+            'dofs': element_dofs(idx1, idx2, 3),
+            'L': L,
+            'k_local': k_local,
+            'T': T,
+            'kT': k_local @ T
+        }
+
+    def _load_vector(self, node_map, loads):
+        # loads: columns node, fx, fy, m; loads on unknown nodes are ignored
+        num_dof = 3 * len(node_map['ids'])
+        idx, found = lookup(node_map['ids'], loads['node'])
+        F_global = np.zeros(num_dof)
+        for k, field in enumerate(('fx', 'fy', 'm')):
+            F_global += np.bincount(3 * idx[found] + k, weights=loads[field][found], minlength=num_dof)
+        return F_global
+
+    def _solve_dofs(self, structure, F_global):
+        # F_global holds one load vector, or one column per load case
+        K_global, free_dofs, factor, _ = structure
+        d_f = factor(F_global[free_dofs])
+        
+        d_global = np.zeros(F_global.shape)
         d_global[free_dofs] = d_f
         
         # Calculate Reactions
         R_global = K_global @ d_global - F_global
-        
+        return d_global, R_global
+
+    def _member_forces(self, members, d_global):
+        # Local end forces acting on each member, (n, 6) = (fx1, fy1, m1, fx2, fy2, m2)
+        # per element, with a trailing load-case axis when d_global has one
+        d_e = d_global[members['dofs']]
+        return np.einsum('nij,nj...->ni...', members['kT'], d_e)
+
+    def _member_diagrams(self, members, f, num_points):
+        # Internal forces at num_points stations along each member (no member loads,
+        # so N and V are constant and M is linear). Tension and sagging are positive.
+        x = members['L'][:, None] * np.linspace(0.0, 1.0, num_points)
+        N = np.repeat(-f[:, 0:1], num_points, axis=1)
+        V = np.repeat(f[:, 1:2], num_points, axis=1)
+        M = -f[:, 2:3] + f[:, 1:2] * x
+        return x, N, V, M
+
+    def _format_results(self, node_map, d_global, R_global, members, member_points=0):
         # Format Results
-        results = {
-            'nodes': [],
-            'elements': [],
-            'reactions': []
-        }
+        results = {}
         
         # Nodal Displacements
-        for nid, idx in node_map.items():
-            results['nodes'].append({
-                'id': nid,
-                'x': self.nodes[nid]['x'],
-                'y': self.nodes[nid]['y'],
-                'u': d_global[3*idx],
-                'v': d_global[3*idx+1],
-                'theta': d_global[3*idx+2]
-            })
-            
-            # Check reaction
-            # If node has support, record reaction
-            if nid in self.supports:
-                results['reactions'].append({
-                    'node': nid,
-                    'Rx': R_global[3*idx],
-                    'Ry': R_global[3*idx+1],
-                    'Mz': R_global[3*idx+2]
-                })
+        ids = node_map['ids'].tolist()
+        d = d_global.reshape(-1, 3)
+        results['nodes'] = [{
+            'id': nid, 'x': x, 'y': y, 'u': u, 'v': v, 'theta': theta
+        } for nid, x, y, (u, v, theta) in zip(ids, node_map['x'].tolist(), node_map['y'].tolist(), d.tolist())]
+        
+        # Reactions at the nodes that have a support
+        _, supported = self._restraints(node_map)
+        R = R_global.reshape(-1, 3)[supported]
+        reactions = [{
+            'node': nid, 'Rx': rx, 'Ry': ry, 'Mz': mz
+        } for nid, (rx, ry, mz) in zip(node_map['ids'][supported].tolist(), R.tolist())]
                 
-        # Element Forces (not strictly required for drawing deformed shape, but good for info)
-        # We can just return the deformed node positions for visualization primarily
+        # Element end forces in local axes, all members in one batched product
+        f = self._member_forces(members, d_global)
+        f = np.where(np.abs(f) < 1e-8, 0.0, f)
+        e = self.elements
+        results['elements'] = [{
+            'id': eid, 'n1': n1, 'n2': n2,
+            'N1': f1[0], 'V1': f1[1], 'M1': f1[2],
+            'N2': f1[3], 'V2': f1[4], 'M2': f1[5]
+        } for eid, n1, n2, f1 in zip(e['id'].tolist(), e['n1'].tolist(), e['n2'].tolist(), f.tolist())]
+        results['reactions'] = reactions
+        
+        if member_points >= 2:
+            x, N, V, M = self._member_diagrams(members, f, member_points)
+            for i, entry in enumerate(results['elements']):
+                entry['diagram'] = {'x': x[i].tolist(), 'N': N[i].tolist(), 'V': V[i].tolist(), 'M': M[i].tolist()}
         
         return results
 
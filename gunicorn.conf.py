@@ -0,0 +1,81 @@
+import os
+
+# Production server settings; gunicorn reads this file from the working directory:
+#
+#   gunicorn app:app                          # one worker per CPU on port 5001
+#   SERVE_WORKERS=4 SERVE_PORT=8000 gunicorn app:app
+#
+# Settings come from the environment (gunicorn's command-line options override them):
+#   SERVE_HOST, SERVE_PORT, SERVE_WORKERS  bind address and worker processes
+#   SERVE_THREADS      connection threads per worker (gthread workers), so open /live
+#                      streams and slow clients do not hold a whole process; solves
+#                      still run SOLVE_CONCURRENCY at a time per worker (tasks.py)
+#   BLAS_THREADS       BLAS/OpenMP threads per worker (default CPUs / workers), so
+#                      concurrent solves do not oversubscribe the cores
+#   WORKER_TIMEOUT     seconds a worker may stop responding before it is killed and
+#                      replaced (a hung worker; requests are limited by SOLVE_TIME_LIMIT
+#                      in app.py, which answers 503)
+#   LOG_LEVEL          default INFO here (the development server logs DEBUG)
+#
+# Each worker imports the app after it is forked, with the BLAS thread caps in
+# place, and runs a tiny beam and frame solve before it accepts connections.
+# Sessions, live channels, background jobs, caches and /metrics belong to the
+# worker process that served the request; with several workers, clients of
+# /sessions, /live and /jobs need a proxy that pins them to one worker (or run a
+# single worker).
+
+BLAS_ENV = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+            'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+_cpus = os.cpu_count() or 1
+
+bind = f"{os.environ.get('SERVE_HOST', '0.0.0.0')}:{int(os.environ.get('SERVE_PORT', 5001))}"
+workers = max(1, int(os.environ.get('SERVE_WORKERS', _cpus)))
+worker_class = 'gthread'
+threads = int(os.environ.get('SERVE_THREADS', 16))
+timeout = int(os.environ.get('WORKER_TIMEOUT', 120))
+graceful_timeout = 10
+preload_app = False # NumPy must be imported after post_fork sets the thread caps
+
+os.environ.setdefault('LOG_LEVEL', 'INFO')
+loglevel = os.environ['LOG_LEVEL'].lower()
+
+_blas_threads = int(os.environ.get('BLAS_THREADS') or max(1, _cpus // workers))
+
+
+def warm_up():
+    # Imports the solver stack and runs one small solve of each kind through both
+    # the dense and the sparse frame path, outside the factorization cache
+    import tasks
+    tasks.run_task('beam', {'length': 2.0, 'supports': [{'pos': 0.0, 'type': 'fixed'}],
+                            'loads': [{'pos': 2.0, 'magnitude': -1.0}], 'num_points': 3})
+    frame = {
+        'nodes': [{'id': 1, 'x': 0.0, 'y': 0.0}, {'id': 2, 'x': 0.0, 'y': 3.0}, {'id': 3, 'x': 4.0, 'y': 3.0}],
+        'elements': [{'id': 1, 'n1': 1, 'n2': 2, 'E': 2e11, 'A': 0.01, 'I': 1e-4},
+                     {'id': 2, 'n1': 2, 'n2': 3, 'E': 2e11, 'A': 0.01, 'I': 1e-4}],
+        'supports': [{'node': 1, 'type': 'fixed'}, {'node': 3, 'type': 'pin'}],
+        'loads': [{'node': 2, 'fx': 1.0, 'fy': -1.0, 'm': 0.0}]
+    }
+    for method in ('dense', 'sparse'):
+        tasks.run_task('frame', dict(frame, method=method))
+
+
+def when_ready(server):
+    server.log.info(f"{workers} workers, {threads} threads and {_blas_threads} BLAS threads each")
+    if workers > 1:
+        server.log.info("sessions and background jobs are per worker; pin their clients to one worker")
+
+
+def post_fork(server, worker):
+    # Before the worker imports the app: BLAS thread pools are sized when NumPy loads
+    for name in BLAS_ENV:
+        os.environ[name] = str(_blas_threads)
+
+
+def post_worker_init(worker):
+    warm_up()
+
+
+def worker_exit(server, worker):
+    from app import job_manager
+    job_manager.shutdown()
@@ -0,0 +1,245 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from multiprocessing.connection import wait
+
+import tasks
+from solver_cache import LRUCache
+
+# Background solves for large models. Jobs run in a fixed number of long-lived
+# worker processes (no external broker). A worker whose job times out or is
+# cancelled while running is killed and replaced, so a runaway solve cannot hold
+# a slot forever. Small jobs skip the queue and run in the calling thread.
+
+FINISHED_STATES = ('done', 'failed', 'cancelled', 'timeout')
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _worker_main(conn):
+    # Worker process loop: receives (job_id, kind, data), replies (job_id, ok, result or message)
+    cache = LRUCache(maxsize=8, max_bytes=256 * 1024 * 1024)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        job_id, kind, data = message
+        try:
+            conn.send((job_id, True, tasks.run_task(kind, data, cache)))
+        except Exception as e:
+            conn.send((job_id, False, str(e)))
+
+
+class _WorkerSlot:
+    # One worker process plus the job it is currently running
+    def __init__(self, context):
+        self.context = context
+        self.job = None
+        self._spawn()
+
+    def _spawn(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.job = None
+
+    def restart(self):
+        self.stop()
+        self._spawn()
+
+    def stop(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class JobManager:
+    def __init__(self, max_workers=2, max_queue=64, timeout=300, sync_limit=3000, keep_finished=500):
+        # max_workers: worker processes (concurrent background solves)
+        # max_queue: queued jobs beyond which submit() raises JobQueueFull
+        # timeout: seconds a background job may run before it is killed
+        # sync_limit: jobs with tasks.task_size() up to this run synchronously
+        # keep_finished: finished jobs kept for polling before the oldest are dropped
+        self.max_workers = int(max_workers)
+        self.max_queue = int(max_queue)
+        self.timeout = float(timeout)
+        self.sync_limit = int(sync_limit)
+        self.keep_finished = int(keep_finished)
+
+        self._jobs = OrderedDict() # id -> job dict
+        self._pending = deque() # (job, data)
+        self._slots = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+    def submit(self, kind, data, cache=None):
+        if kind not in tasks.TASKS:
+            raise ValueError(f"Unknown task kind: {kind}")
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'state': 'queued',
+            'mode': 'sync',
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None
+        }
+
+        if tasks.task_size(kind, data) <= self.sync_limit:
+            # Direct path: not worth a round trip through a worker process
+            job['state'] = 'running'
+            job['started_at'] = time.time()
+            try:
+                self._finish(job, 'done', result=tasks.run_task(kind, data, cache))
+            except Exception as e:
+                self._finish(job, 'failed', error=str(e))
+            with self._cond:
+                self._store(job)
+            return job
+
+        job['mode'] = 'async'
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Job manager is shut down")
+            if len(self._pending) >= self.max_queue:
+                raise JobQueueFull(f"Job queue is full ({self.max_queue} jobs waiting)")
+            self._store(job)
+            self._pending.append((job, data))
+            self._start()
+            self._cond.notify()
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        # Queued jobs are dropped; running ones are killed by the dispatcher.
+        # Returns the job, or None if it does not exist.
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job['state'] in FINISHED_STATES:
+                return job
+            if job['state'] == 'queued':
+                self._pending = deque((j, d) for j, d in self._pending if j is not job)
+            self._finish(job, 'cancelled', error="Cancelled")
+            self._cond.notify_all()
+            return job
+
+    def wait(self, job, timeout=None):
+        # Blocks until job is finished or timeout passes; returns whether it finished
+        with self._cond:
+            return self._cond.wait_for(lambda: job['state'] in FINISHED_STATES, timeout)
+
+    def stats(self):
+        with self._cond:
+            states = {}
+            for job in self._jobs.values():
+                states[job['state']] = states.get(job['state'], 0) + 1
+            return {
+                'workers': self.max_workers,
+                'busy_workers': sum(1 for slot in self._slots if slot.job is not None),
+                'queued': len(self._pending),
+                'max_queue': self.max_queue,
+                'timeout': self.timeout,
+                'jobs': states
+            }
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        for slot in self._slots:
+            slot.stop()
+        self._slots = []
+
+    @staticmethod
+    def describe(job):
+        # Public view of a job (everything except the result)
+        return {k: v for k, v in job.items() if k != 'result'}
+
+    def _start(self):
+        # Workers start on the first background job (called with the lock held)
+        if self._thread is None:
+            context = multiprocessing.get_context('spawn')
+            self._slots = [_WorkerSlot(context) for _ in range(self.max_workers)]
+            self._thread = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+            self._thread.start()
+
+    def _store(self, job):
+        self._jobs[job['id']] = job
+        # Drop the oldest finished jobs beyond the retention limit
+        finished = [jid for jid, j in self._jobs.items() if j['state'] in FINISHED_STATES]
+        for jid in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[jid]
+
+    def _finish(self, job, state, result=None, error=None):
+        job['state'] = state
+        job['result'] = result
+        job['error'] = error
+        job['finished_at'] = time.time()
+
+    def _dispatch(self):
+        # Single thread owning the worker slots: hands out jobs, enforces
+        # timeouts and cancellations, and collects results.
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                now = time.time()
+                for slot in self._slots:
+                    job = slot.job
+                    if job is None:
+                        continue
+                    if job['state'] == 'cancelled':
+                        slot.restart()
+                    elif now - job['started_at'] > self.timeout:
+                        self._finish(job, 'timeout', error=f"Job exceeded the {self.timeout:g} s time limit")
+                        slot.restart()
+                        self._cond.notify_all()
+
+                for slot in self._slots:
+                    if slot.job is None and self._pending:
+                        job, data = self._pending.popleft()
+                        job['state'] = 'running'
+                        job['started_at'] = time.time()
+                        slot.conn.send((job['id'], job['kind'], data))
+                        slot.job = job
+
+                busy = {slot.conn: slot for slot in self._slots if slot.job is not None}
+                if not busy:
+                    self._cond.wait(timeout=1.0)
+                    continue
+
+            for conn in wait(list(busy), timeout=0.05):
+                slot = busy[conn]
+                try:
+                    job_id, ok, payload = conn.recv()
+                except (EOFError, OSError):
+                    job_id, ok, payload = None, False, "Worker process exited unexpectedly"
+                with self._cond:
+                    job = slot.job
+                    slot.job = None
+                    if job_id is None:
+                        slot.restart()
+                    if job is None or job['state'] != 'running':
+                        continue # cancelled or timed out meanwhile
+                    if ok:
+                        self._finish(job, 'done', result=payload)
+                    else:
+                        self._finish(job, 'failed', error=payload)
+                    self._cond.notify_all() # wake wait()ers
@@ -0,0 +1,214 @@
+import json
+import threading
+import uuid
+
+import tasks
+from jobs import FINISHED_STATES
+
+# Live recalculation channels for the editor tabs. A browser opens one
+# Server-Sent Events stream (GET /live) and posts edits to it as commands
+# (POST /live/<channel>):
+#
+#   {'kind': 'beam' | 'pillar' | 'frame', 'seq': 12, 'payload': <the /calculate* body>}
+#
+# seq increases per kind. Only the newest command of each kind is kept: a
+# command that has not started yet is replaced by a newer one, and a solve that
+# is superseded while it runs is abandoned between stages (background jobs, used
+# for large models, are cancelled outright). Results arrive as 'result' events:
+#
+#   {'kind', 'seq', 'stage': 'coarse' | 'full', 'final', 'status': 'success', 'data': ...}
+#   {'kind', 'seq', 'stage', 'final': true, 'status': 'error', 'message': ...}
+#
+# A beam is first solved at COARSE_POINTS sample points (a frame with
+# member_points, without member sampling) so the diagrams update at once; the
+# full resolution follows from the factorization cache.
+#
+# The stream's thread runs the channel's solves, so channels need a threaded
+# server. Inline solves take a slot like any other (tasks.solve_slot), so an
+# open stream costs a waiting thread, not a core. Like sessions, a channel
+# belongs to the process that opened it.
+
+LIVE_KINDS = ('beam', 'pillar', 'frame')
+
+# Sample points of the first beam result
+COARSE_POINTS = 50
+
+# Seconds between keep-alive comments; a closed connection is noticed on the next write
+HEARTBEAT = 15.0
+
+# Seconds between checks for a newer command while a background job runs
+POLL_INTERVAL = 0.05
+
+
+class ChannelLimit(Exception):
+    pass
+
+
+class StaleCommand(ValueError):
+    # A command whose seq is not newer than one already received for its kind
+    pass
+
+
+def stages(kind, payload):
+    # (stage, payload) pairs to solve in order: a cheaper coarse version first
+    # where there is one, then the payload as sent
+    if kind == 'beam' and payload.get('output', 'sampled') == 'sampled' \
+            and int(payload.get('num_points', 500)) > COARSE_POINTS:
+        return [('coarse', dict(payload, num_points=COARSE_POINTS)), ('full', payload)]
+    if kind == 'frame' and int(payload.get('member_points', 0)) > 0:
+        return [('coarse', dict(payload, member_points=0)), ('full', payload)]
+    return [('full', payload)]
+
+
+def event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class LiveChannel:
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.closed = False
+        self._cond = threading.Condition()
+        self._latest = {} # kind -> newest seq received
+        self._pending = {} # kind -> (seq, payload) not started yet
+
+    def post(self, kind, seq, payload):
+        # Queues a command; returns the seq of the unstarted command it replaced, if any
+        if kind not in LIVE_KINDS:
+            raise ValueError(f"Unknown live kind: {kind}")
+        if not isinstance(payload, dict):
+            raise ValueError("Command payload must be an object")
+        seq = int(seq)
+        with self._cond:
+            if self.closed:
+                raise ValueError("Channel is closed")
+            if seq <= self._latest.get(kind, -1):
+                raise StaleCommand(f"Sequence number {seq} is not newer than {self._latest[kind]} for {kind}")
+            self._latest[kind] = seq
+            replaced = self._pending.pop(kind, None)
+            self._pending[kind] = (seq, payload) # re-inserted last: commands run in arrival order
+            self._cond.notify()
+        return replaced[0] if replaced is not None else None
+
+    def next_command(self, timeout):
+        # Oldest pending command as (kind, seq, payload), or None after timeout
+        with self._cond:
+            if not self._pending and not self.closed:
+                self._cond.wait(timeout)
+            if not self._pending or self.closed:
+                return None
+            kind = next(iter(self._pending))
+            seq, payload = self._pending.pop(kind)
+            return kind, seq, payload
+
+    def superseded(self, kind, seq):
+        with self._cond:
+            return self.closed or self._latest.get(kind, -1) > seq
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._pending.clear()
+            self._cond.notify()
+
+
+class LiveHub:
+    def __init__(self, job_manager, cache=None, results=None, max_channels=256):
+        # job_manager: runs solves larger than its sync_limit in a worker process,
+        # where a superseded one can be killed; smaller ones run in the stream's thread
+        # cache: factorization cache shared with the HTTP endpoints
+        # results: result_cache.ResultCache shared with the HTTP endpoints
+        # max_channels: open streams beyond which open() raises ChannelLimit
+        self.job_manager = job_manager
+        self.cache = cache
+        self.results = results
+        self.max_channels = int(max_channels)
+        self._channels = {}
+        self._lock = threading.Lock()
+        self.counts = {'commands': 0, 'replaced': 0, 'cancelled': 0, 'results': 0, 'errors': 0}
+
+    def open(self):
+        with self._lock:
+            if len(self._channels) >= self.max_channels:
+                raise ChannelLimit(f"Too many live channels ({self.max_channels} open)")
+            channel = LiveChannel()
+            self._channels[channel.id] = channel
+            return channel
+
+    def get(self, channel_id):
+        with self._lock:
+            return self._channels.get(channel_id)
+
+    def close(self, channel):
+        channel.close()
+        with self._lock:
+            self._channels.pop(channel.id, None)
+
+    def post(self, channel, kind, seq, payload):
+        replaced = channel.post(kind, seq, payload)
+        with self._lock:
+            self.counts['commands'] += 1
+            self.counts['replaced'] += replaced is not None
+        return replaced
+
+    def stats(self):
+        with self._lock:
+            return {'channels': len(self._channels), 'max_channels': self.max_channels, **self.counts}
+
+    def stream(self, channel):
+        # SSE body for one channel: runs its commands until the client goes away
+        try:
+            yield "retry: 2000\n" + event('channel', {'id': channel.id})
+            while not channel.closed:
+                command = channel.next_command(HEARTBEAT)
+                if command is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                kind, seq, payload = command
+                plan = stages(kind, payload)
+                for i, (stage, stage_payload) in enumerate(plan):
+                    if channel.superseded(kind, seq):
+                        break
+                    message = self._solve(channel, kind, seq, stage_payload)
+                    if message is None:
+                        break # superseded while running
+                    final = i == len(plan) - 1 or message['status'] == 'error'
+                    with self._lock:
+                        self.counts['results'] += 1
+                        self.counts['errors'] += message['status'] == 'error'
+                    yield event('result', {'kind': kind, 'seq': seq, 'stage': stage, 'final': final, **message})
+                    if final:
+                        break
+        finally:
+            self.close(channel)
+
+    def _solve(self, channel, kind, seq, payload):
+        # {'status', 'data' | 'message'}, or None if a newer command cancelled the job
+        key = None
+        if self.results is not None:
+            key = self.results.key(kind, payload)
+            result = self.results.get(key)
+            if result is not None:
+                return {'status': 'success', 'data': result}
+        message = self._run(channel, kind, seq, payload)
+        if key is not None and message is not None and message['status'] == 'success':
+            self.results.put(key, message['data'])
+        return message
+
+    def _run(self, channel, kind, seq, payload):
+        try:
+            if tasks.task_size(kind, payload) <= self.job_manager.sync_limit:
+                return {'status': 'success', 'data': tasks.run_task(kind, payload, self.cache)}
+            job = self.job_manager.submit(kind, payload, cache=self.cache)
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+        while job['state'] not in FINISHED_STATES:
+            self.job_manager.wait(job, POLL_INTERVAL)
+            if job['state'] not in FINISHED_STATES and channel.superseded(kind, seq):
+                self.job_manager.cancel(job['id'])
+                with self._lock:
+                    self.counts['cancelled'] += 1
+                return None
+        if job['state'] == 'done':
+            return {'status': 'success', 'data': job['result']}
+        return {'status': 'error', 'message': job['error']}
@@ -0,0 +1,39 @@
+import numpy as np
+
+# Helpers shared by the batch (multiple load case) solvers
+
+def parse_cases(cases, parse):
+    # Validates a list of named load cases; parse(case) converts the loads of one case.
+    # Returns (names, parsed loads per case)
+    if not cases:
+        raise ValueError("At least one load case is required")
+    names, parsed = [], []
+    for case in cases:
+        name = str(case['name'])
+        if name in names:
+            raise ValueError(f"Duplicate load case name: {name}")
+        names.append(name)
+        parsed.append(parse(case))
+    return names, parsed
+
+
+def combination_matrix(names, combinations):
+    # (n_cases, n_combinations) matrix of load factors
+    index = {name: j for j, name in enumerate(names)}
+    C = np.zeros((len(names), len(combinations)))
+    seen = set()
+    for j, combo in enumerate(combinations):
+        if combo['name'] in seen:
+            raise ValueError(f"Duplicate combination name: {combo['name']}")
+        seen.add(combo['name'])
+        for case_name, factor in combo['factors'].items():
+            if case_name not in index:
+                raise ValueError(f"Combination {combo['name']} refers to unknown load case {case_name}")
+            C[index[case_name], j] += float(factor)
+    return C
+
+
+def min_max(values):
+    # Envelope over the last axis (one column per case/combination)
+    values = np.asarray(values)
+    return {'min': np.min(values, axis=-1).tolist(), 'max': np.max(values, axis=-1).tolist()}
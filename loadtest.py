@@ -0,0 +1,131 @@
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+import benchmark
+
+# Closed-loop load test against a running server (gunicorn or app.py): each of
+# --concurrency clients posts the same generated model back to back until
+# --requests have been sent or --duration has passed. Requests carry
+# Cache-Control: no-cache, so every one is solved rather than answered from the
+# server's result cache (--cached measures the cached path instead).
+#
+#   SERVE_WORKERS=4 gunicorn app:app &
+#   python loadtest.py --kind frame --size 10 --concurrency 8 --requests 400
+#
+# Reports throughput, latency percentiles and response status counts; the exit
+# status is 1 if any request failed.
+
+MODELS = {
+    # kind -> model for a size parameter
+    'beam': lambda size: benchmark.make_beam(size, 4),
+    'frame': lambda size: benchmark.make_frame_grid(size, size),
+    'pillar': lambda size: {'length': 3.0, 'E': 200e9, 'I': 8.0e-6, 'A': 0.01, 'k_type': 'pin-pin'},
+    'pillar_sweep': lambda size: benchmark.make_pillar_sweep(size)
+}
+
+
+def post(url, body, timeout, cached=False):
+    # (status, seconds); status 0 for connection errors. Unless cached, the request
+    # carries Cache-Control: no-cache so the server solves it every time.
+    headers = {'Content-Type': 'application/json'}
+    if not cached:
+        headers['Cache-Control'] = 'no-cache'
+    request = urllib.request.Request(url, data=body, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = 0
+    return status, time.perf_counter() - start
+
+
+def run(url, body, concurrency, requests, duration, timeout, cached=False):
+    lock = threading.Lock()
+    results = [] # (status, seconds)
+    deadline = time.perf_counter() + duration if duration else None
+
+    def client():
+        while True:
+            with lock:
+                if (requests and len(results) + pending[0] >= requests) or \
+                        (deadline and time.perf_counter() >= deadline):
+                    return
+                pending[0] += 1
+            outcome = post(url, body, timeout, cached)
+            with lock:
+                pending[0] -= 1
+                results.append(outcome)
+
+    pending = [0]
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    latencies = np.array([seconds for _, seconds in results])
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    summary = {
+        'requests': len(results),
+        'seconds': elapsed,
+        'throughput': len(results) / elapsed if elapsed > 0 else 0.0,
+        'statuses': statuses
+    }
+    if len(latencies):
+        summary['latency_ms'] = {
+            'mean': float(latencies.mean() * 1000),
+            **{f'p{q}': float(np.percentile(latencies, q) * 1000) for q in (50, 90, 99)},
+            'max': float(latencies.max() * 1000)
+        }
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for the solver API")
+    parser.add_argument('--url', default='http://127.0.0.1:5001')
+    parser.add_argument('--kind', choices=sorted(MODELS), default='frame')
+    parser.add_argument('--size', type=int, default=10, help="model size (spans, bays x storeys or grid points)")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, help="total requests (default 200 unless --duration is given)")
+    parser.add_argument('--duration', type=float, help="seconds to run")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--cached', action='store_true',
+                        help="let the server answer repeats from its result cache (default: solve every request)")
+    args = parser.parse_args(argv)
+    if not args.requests and not args.duration:
+        args.requests = 200
+
+    url = args.url.rstrip('/') + benchmark.ENDPOINTS[args.kind]
+    body = json.dumps(MODELS[args.kind](args.size)).encode()
+    # One request first, so a wrong URL fails fast instead of flooding errors
+    status, _ = post(url, body, args.timeout)
+    if status != 200:
+        print(f"{url} answered {status or 'no connection'}", file=sys.stderr)
+        return 1
+
+    results, elapsed = run(url, body, max(1, args.concurrency), args.requests, args.duration, args.timeout, args.cached)
+    summary = summarize(results, elapsed)
+    print(json.dumps(summary, indent=2))
+    return 0 if summary['statuses'].get('200', 0) == len(results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
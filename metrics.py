@@ -0,0 +1,138 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Phase timers for the solvers and a small in-process metrics registry rendered
+# in the Prometheus text exposition format (no client library needed).
+
+# Seconds; spans sub-millisecond cached solves up to long background jobs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# Per-thread solve deadline (see set_deadline)
+_deadline = threading.local()
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def set_deadline(seconds):
+    # Solver phases this thread starts more than `seconds` from now raise
+    # DeadlineExceeded; None or 0 clears the deadline. The check is cooperative:
+    # a phase that has started (one LAPACK call, say) runs to the end.
+    _deadline.seconds = seconds
+    _deadline.at = time.perf_counter() + seconds if seconds else None
+
+
+def check_deadline():
+    at = getattr(_deadline, 'at', None)
+    if at is not None and time.perf_counter() > at:
+        raise DeadlineExceeded(f"Solve time limit of {_deadline.seconds:g} s exceeded")
+
+
+@contextmanager
+def timed(timings, phase, deadline=True):
+    # Adds the wall time spent in the block to timings[phase] (seconds).
+    # Solver phases are also deadline checkpoints (see set_deadline); bookkeeping
+    # after the work is done (cache, encode) passes deadline=False.
+    if deadline:
+        check_deadline()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+
+
+def server_timing(timings):
+    # Server-Timing header value; durations are in milliseconds
+    return ', '.join(f"{phase};dur={seconds * 1000:.3f}" for phase, seconds in timings.items())
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+
+def _value(v):
+    if isinstance(v, int):
+        return str(v)
+    return repr(float(v)) if v == v else 'NaN'
+
+
+class _Histogram:
+    def __init__(self, help, buckets):
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.series = {} # label tuple -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, name):
+        lines = []
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(float(bound))
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_value(series[-1])}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    # Counters, gauges and histograms keyed by name and a sorted label set.
+    # Collectors are callables returning [(name, type, help, [(labels dict, value)])]
+    # evaluated at render time, for values owned elsewhere (cache and job stats).
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {} # name -> (help, {labels: value})
+        self._gauges = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def inc(self, name, help, amount=1, **labels):
+        with self._lock:
+            _, series = self._counters.setdefault(name, (help, {}))
+            key = tuple(sorted(labels.items()))
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name, help, value, **labels):
+        with self._lock:
+            _, series = self._gauges.setdefault(name, (help, {}))
+            series[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name, help, value, buckets=DEFAULT_BUCKETS, **labels):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram(help, buckets)
+            histogram.observe(tuple(sorted(labels.items())), value)
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for kind, metrics in (('counter', self._counters), ('gauge', self._gauges)):
+                for name, (help, series) in sorted(metrics.items()):
+                    lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                    lines += [f"{name}{_labels(k)} {_value(v)}" for k, v in sorted(series.items())]
+            for name, histogram in sorted(self._histograms.items()):
+                lines += [f"# HELP {name} {histogram.help}", f"# TYPE {name} histogram"]
+                lines += histogram.render(name)
+        for collector in self._collectors:
+            for name, kind, help, samples in collector():
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{_labels(tuple(sorted(labels.items())))} {_value(v)}" for labels, v in samples]
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,99 @@
+import numpy as np
+
+# Struct-of-arrays storage for solver models: one NumPy array per field instead
+# of one dict per node, element, support or load. Rows can be appended one at a
+# time (the solvers' add_* methods; capacity doubles, so appends are amortized
+# O(1)) or a whole column set at once (from_arrays and column-shaped payloads).
+
+
+class ColumnTable:
+    def __init__(self, **dtypes):
+        # dtypes: field name -> NumPy dtype
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in dtypes.items()}
+        self._data = {name: np.empty(0, dtype=dtype) for name, dtype in self.dtypes.items()}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, name):
+        # View of the filled part of a column
+        return self._data[name][:self._size]
+
+    def _reserve(self, size):
+        capacity = len(next(iter(self._data.values()), ()))
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 16)
+        for name, column in self._data.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._data[name] = grown
+
+    def append(self, **values):
+        self._reserve(self._size + 1)
+        for name in self.dtypes:
+            self._data[name][self._size] = values[name]
+        self._size += 1
+
+    def extend(self, columns):
+        # columns: field name -> array, all of the same length (see columns())
+        lengths = {len(columns[name]) for name in self.dtypes}
+        if len(lengths) > 1:
+            raise ValueError("Columns must all have the same length")
+        n = lengths.pop() if lengths else 0
+        self._reserve(self._size + n)
+        for name, dtype in self.dtypes.items():
+            self._data[name][self._size:self._size + n] = np.asarray(columns[name], dtype=dtype)
+        self._size += n
+
+
+def columns(section, dtypes, defaults=None):
+    # Payload section -> {field: array}. Accepts a list of records
+    # ([{'id': 1, 'x': 0.0}, ...]) or a mapping of equal-length columns
+    # ({'id': [1, ...], 'x': [0.0, ...]}). Fields in defaults may be missing.
+    defaults = defaults or {}
+    if isinstance(section, dict):
+        lengths = {len(np.atleast_1d(v)) for v in section.values()}
+        n = max(lengths) if lengths else 0
+        if len(lengths) > 1:
+            raise ValueError("Columns must all have the same length")
+        result = {}
+        for name, dtype in dtypes.items():
+            if name in section:
+                result[name] = np.asarray(section[name], dtype=dtype).reshape(-1)
+            elif name in defaults:
+                result[name] = np.full(n, defaults[name], dtype=dtype)
+            else:
+                raise ValueError(f"Missing field: {name}")
+        return result
+
+    records = list(section or [])
+    result = {}
+    for name, dtype in dtypes.items():
+        if name in defaults:
+            values = [r.get(name, defaults[name]) for r in records]
+        else:
+            try:
+                values = [r[name] for r in records]
+            except KeyError:
+                raise ValueError(f"Missing field: {name}")
+        result[name] = np.array(values, dtype=dtype).reshape(-1)
+    return result
+
+
+def last_unique(keys):
+    # Indices of the last occurrence of every distinct key, ordered by key: later
+    # rows replace earlier ones, as with repeated dict assignment
+    keys = np.asarray(keys)
+    _, first = np.unique(keys[::-1], return_index=True)
+    return len(keys) - 1 - first
+
+
+def lookup(sorted_keys, keys):
+    # Positions of keys in sorted_keys and a mask of the keys that were found
+    keys = np.asarray(keys)
+    index = np.searchsorted(sorted_keys, keys)
+    found = index < len(sorted_keys)
+    found[found] = sorted_keys[index[found]] == keys[found]
+    return np.where(found, index, 0), found
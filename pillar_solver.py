@@ -1,4 +1,32 @@
 import numpy as np
+from columnar import encode_array
+
+# Effective length factors for the supported end conditions
+K_FACTORS = {
+    'pin-pin': 1.0,
+    'fixed-free': 2.0,
+    'fixed-fixed': 0.5,
+    'fixed-pin': 0.7
+}
+
+# Upper limit on the number of grid points in one sweep
+MAX_SWEEP_POINTS = 5_000_000
+
+
+def _sweep_axis(name, value):
+    # Scalar, list, or range {'start', 'stop', 'num', 'log': bool} -> 1D float array
+    if isinstance(value, dict):
+        num = int(value.get('num', 50))
+        if num < 1:
+            raise ValueError(f"{name}: num must be at least 1")
+        if value.get('log'):
+            return np.geomspace(float(value['start']), float(value['stop']), num)
+        return np.linspace(float(value['start']), float(value['stop']), num)
+    axis = np.atleast_1d(np.asarray(value, dtype=float))
+    if axis.ndim != 1 or len(axis) == 0:
+        raise ValueError(f"{name}: expected a number, a list of numbers or a range")
+    return axis
+
 
 class PillarSolver:
     def __init__(self, length, E, I, A, k_factor_type):
@@ -9,13 +37,7 @@ class PillarSolver:
         
         # Determine K factor
         # Types: 'pin-pin', 'fixed-free', 'fixed-fixed', 'fixed-pin'
-        self.K = 1.0
-        if k_factor_type == 'fixed-free':
-            self.K = 2.0
-        elif k_factor_type == 'fixed-fixed':
-            self.K = 0.5
-        elif k_factor_type == 'fixed-pin':
-            self.K = 0.7
+        self.K = K_FACTORS.get(k_factor_type, 1.0)
             
     def solve(self):
         # Euler Critical Load
@@ -45,3 +67,48 @@ class PillarSolver:
             "L_eff": effective_length
         }
 
+    @staticmethod
+    def sweep(length, E, I, A, k_factor_type, dtype='float64'):
+        # Evaluate the Euler formulas over the full grid of all inputs in one
+        # broadcast pass. Every input may be a scalar, a list or a range
+        # {'start', 'stop', 'num', 'log'}; k_factor_type may be a list of types.
+        # Grid axes are (length, E, I, A, k_type); result grids are returned as
+        # base64 columns (see columnar.py) of that shape, in C order.
+        # Points with zero effective length give NaN instead of an error.
+        k_types = [k_factor_type] if isinstance(k_factor_type, str) else list(k_factor_type)
+        axes = {
+            'length': _sweep_axis('length', length),
+            'E': _sweep_axis('E', E),
+            'I': _sweep_axis('I', I),
+            'A': _sweep_axis('A', A)
+        }
+        K_axis = np.array([K_FACTORS.get(k, 1.0) for k in k_types])
+        if len(K_axis) == 0:
+            raise ValueError("k_type: at least one end condition is required")
+        
+        shape = tuple(len(a) for a in axes.values()) + (len(K_axis),)
+        if np.prod(shape, dtype=np.int64) > MAX_SWEEP_POINTS:
+            raise ValueError(f"Sweep has {np.prod(shape, dtype=np.int64)} points, limit is {MAX_SWEEP_POINTS}")
+        
+        # Put each axis on its own dimension so the formulas broadcast to the grid
+        L, E_, I_, A_, K = np.ix_(axes['length'], axes['E'], axes['I'], axes['A'], K_axis)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            effective_length = K * L
+            P_cr = np.where(effective_length != 0, np.pi**2 * E_ * I_ / effective_length**2, np.nan)
+            sigma_cr = np.where(A_ > 0, P_cr / A_, 0.0)
+            r = np.sqrt(np.where(A_ > 0, I_ / A_, 0.0))
+            slenderness = np.where(r > 0, effective_length / r, 0.0)
+        
+        columns = {
+            'P_cr': P_cr,
+            'sigma_cr': sigma_cr,
+            'slenderness': slenderness,
+            'L_eff': effective_length
+        }
+        return {
+            'shape': list(shape),
+            'axes': {**{name: a.tolist() for name, a in axes.items()}, 'k_type': k_types},
+            'K': K_axis.tolist(),
+            'columns': {name: encode_array(np.broadcast_to(v, shape), dtype) for name, v in columns.items()}
+        }
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import uuid
+from collections import OrderedDict
+
+import numpy as np
+
+# Solver results keyed by a canonical hash of the request, so identical models
+# sent again (the page's default examples, switching back to a tab) are not
+# solved again. Requests are normalized before hashing:
+#   - numbers are rounded to `digits` significant digits, -0.0 becomes 0.0
+#   - loads, and frame supports, are sorted, since their order does not change
+#     the solution (see UNORDERED). Beam supports keep their order: reactions
+#     are reported in it.
+#   - column-shaped sections hash like the same records
+# Sections (lists of records or mappings of columns) are hashed column by
+# column as NumPy arrays: numbers as integer mantissa/exponent pairs, anything
+# else through its JSON text. Sorting is a lexsort over those columns, so even
+# a 20k-node frame hashes in under a tenth of a second.
+#
+# The memory tier holds pickled results up to max_bytes, least recently used
+# evicted first. The optional disk tier (one JSON file per result under
+# directory, shared by every process that points at it) keeps results across
+# restarts and is pruned, oldest first, to disk_max_bytes.
+
+# Part of every key: bump it when a solver change alters results, so stale disk
+# entries are never served
+FORMAT_VERSION = 3
+
+# kind -> list sections whose order does not affect the result. None sorts
+# entries whole; a field name sorts by that field only and keeps the order of
+# entries that share it (a later frame support at a node replaces an earlier one).
+UNORDERED = {
+    'beam': {'loads': None, 'dist_loads': None},
+    'frame': {'supports': 'node', 'loads': None}
+}
+
+
+def _normalize(value, digits):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = float(f"{value:.{digits}g}")
+        return 0.0 if value == 0 else value
+    if isinstance(value, dict):
+        return {str(k): _normalize(v, digits) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v, digits) for v in value]
+    return value
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+
+def _columns(section):
+    # {field: list of values} for a section (list of records or mapping of equal-length
+    # columns), or None for anything else
+    if isinstance(section, dict) and section and all(isinstance(v, list) for v in section.values()):
+        if len({len(v) for v in section.values()}) == 1:
+            return {str(k): v for k, v in section.items()}
+        return None
+    if isinstance(section, list) and section and all(isinstance(item, dict) for item in section):
+        fields = sorted({str(k) for item in section for k in item})
+        return {field: [item.get(field) for item in section] for field in fields}
+    return None
+
+
+def _rounded(values, digits):
+    # Numbers -> (mantissa, exponent) int64 arrays with value ~ mantissa * 10**(exponent - digits + 1)
+    # and |mantissa| < 10**digits; None for columns that are not all numbers
+    try:
+        a = np.asarray(values)
+    except ValueError:
+        return None # ragged nested lists
+    if a.ndim != 1 or a.dtype.kind not in 'iuf': # booleans, strings, None and objects are not
+        return None
+    a = a.astype(float)
+    finite = np.isfinite(a)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        e = np.where(finite & (a != 0), np.floor(np.log10(np.abs(a))), 0.0)
+        e = np.clip(e, -300, 300)
+        q = np.round(a * 10.0 ** -e * 10.0 ** (digits - 1))
+    carry = np.abs(q) >= 10.0 ** digits # 9.99...95 rounds up to the next decade
+    q[carry] = np.round(q[carry] / 10)
+    e[carry] += 1
+    # inf, -inf and nan keep distinct exponents outside the finite range
+    e[~finite] = np.where(np.isnan(a[~finite]), 1000, np.where(a[~finite] > 0, 1001, 1002))
+    q[~finite] = 0
+    return q.astype(np.int64), e.astype(np.int64)
+
+
+def _encode(values, digits):
+    # One column as (sort keys, arrays to hash): numbers by mantissa and exponent,
+    # anything else by its normalized JSON text
+    rounded = _rounded(values, digits)
+    if rounded is not None:
+        q, e = rounded
+        return [e, q], [q, e]
+    text = np.array([_dumps(_normalize(v, digits)) for v in values])
+    return [np.unique(text, return_inverse=True)[1]], [text]
+
+
+def _update(h, kind, data, digits):
+    # Feeds the canonical form of a request payload (see the module comment) into hash h
+    if not isinstance(data, dict):
+        h.update(_dumps(_normalize(data, digits)).encode())
+        return
+    unordered = UNORDERED.get(kind, {})
+    for name in sorted(data, key=str):
+        h.update(b'|' + _dumps(str(name)).encode())
+        columns = _columns(data[name])
+        if columns is None:
+            h.update(_dumps(_normalize(data[name], digits)).encode())
+            continue
+        encoded = {field: _encode(values, digits) for field, values in sorted(columns.items())}
+        order = slice(None)
+        if name in unordered:
+            field = unordered[name]
+            keys = [k for f, (sort_keys, _) in encoded.items() if field is None or f == field for k in sort_keys]
+            if keys:
+                order = np.lexsort(keys[::-1]) # stable; the last key passed sorts first
+        for field, (_, arrays) in encoded.items():
+            h.update(b'|' + _dumps(field).encode())
+            for array in arrays:
+                h.update(array.dtype.str.encode() + b':' + np.ascontiguousarray(array[order]).tobytes())
+
+
+class ResultCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, directory=None, disk_max_bytes=1024 ** 3, digits=12):
+        # max_bytes: memory tier size (pickled results); 0 disables it
+        # directory: disk tier location, created if missing; None disables it
+        # disk_max_bytes: disk tier size before the oldest files are removed
+        # digits: significant digits floats are rounded to before hashing
+        self.max_bytes = int(max_bytes)
+        self.directory = directory
+        self.disk_max_bytes = int(disk_max_bytes)
+        self.digits = int(digits)
+        self._entries = OrderedDict() # key -> pickled result
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.not_modified = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+
+    def key(self, kind, data):
+        h = hashlib.sha256(_dumps([FORMAT_VERSION, kind]).encode())
+        _update(h, kind, data, self.digits)
+        return h.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(blob)
+        result = self._disk_get(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        self._memory_put(key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        return result
+
+    def put(self, key, result):
+        self._memory_put(key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        if self.directory is not None:
+            self._disk_put(key, result)
+
+    def count_not_modified(self):
+        # A conditional request answered without a lookup (304)
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            stats = {
+                'size': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'not_modified': self.not_modified
+            }
+            if self.directory is not None:
+                stats['disk_bytes'] = self._disk_bytes
+                stats['disk_max_bytes'] = self.disk_max_bytes
+            return stats
+
+    def _memory_put(self, key, blob):
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = blob
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def _disk_get(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None # missing, pruned by another process, or half-written by a crash
+
+    def _disk_put(self, key, result):
+        path = self._path(key)
+        partial = f"{path}.{uuid.uuid4().hex}.part"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(partial, 'w') as f:
+                json.dump(result, f, separators=(',', ':'))
+            size = os.path.getsize(partial)
+            os.replace(partial, path) # readers never see a half-written result
+        except OSError:
+            if os.path.exists(partial):
+                os.remove(partial)
+            return
+        with self._lock:
+            self._disk_bytes += size
+            prune = self._disk_bytes > self.disk_max_bytes
+        if prune:
+            self._prune()
+
+    def _disk_files(self):
+        # (path, size, mtime) of every result file
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((path, st.st_size, st.st_mtime))
+        return files
+
+    def _prune(self):
+        # Removes the oldest files until the tier is at 90% of its limit
+        files = sorted(self._disk_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        target = 0.9 * self.disk_max_bytes
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
@@ -0,0 +1,149 @@
+import copy
+import threading
+import uuid
+
+import tasks
+from solver_cache import LRUCache
+
+# Server-side frame models that clients edit with small patches instead of
+# re-sending the whole model. Each session keeps the factorization of its last
+# full solve: load-only patches reuse it directly, small stiffness changes are
+# solved with a low-rank update (FrameSolver.solve_reusing).
+#
+# Patch: {'ops': [...]} applied in order, each one of
+#   {'op': 'add',    'kind': 'node' | 'element' | 'support' | 'load', 'value': {...}}
+#   {'op': 'update', 'kind': 'node' | 'element' | 'support' | 'load', 'id': ..., 'value': {fields}}
+#   {'op': 'remove', 'kind': 'node' | 'element' | 'support' | 'load', 'id': ...}
+#   {'op': 'set_loads', 'value': [...]}
+#   {'op': 'set', 'key': 'method' | 'member_points', 'value': ...}
+# Nodes and elements are identified by 'id', supports by their 'node', loads by
+# their index in the load list.
+
+KINDS = {'node': 'nodes', 'element': 'elements', 'support': 'supports', 'load': 'loads'}
+ID_FIELDS = {'nodes': 'id', 'elements': 'id', 'supports': 'node'}
+SETTINGS = ('method', 'member_points')
+
+
+def _find(items, field, value):
+    for i, item in enumerate(items):
+        if item[field] == value:
+            return i
+    raise ValueError(f"No {field} {value} in model")
+
+
+def _records(section):
+    # Column-shaped sections ({'id': [...], 'x': [...]}) become lists of records,
+    # the form patches address
+    if isinstance(section, dict):
+        keys = list(section)
+        return [dict(zip(keys, row)) for row in zip(*(section[k] for k in keys))]
+    return section
+
+
+def apply_patch(model, ops):
+    # Returns a patched copy of model (a /calculate_frame payload); model is unchanged
+    model = copy.deepcopy(model)
+    for key in KINDS.values():
+        model[key] = _records(model.get(key, []))
+
+    for op in ops:
+        name = op.get('op')
+        if name == 'set_loads':
+            model['loads'] = list(op.get('value', []))
+            continue
+        if name == 'set':
+            if op.get('key') not in SETTINGS:
+                raise ValueError(f"Unknown setting: {op.get('key')}")
+            model[op['key']] = op.get('value')
+            continue
+
+        if op.get('kind') not in KINDS:
+            raise ValueError(f"Unknown patch kind: {op.get('kind')}")
+        items = model[KINDS[op['kind']]]
+        field = ID_FIELDS.get(KINDS[op['kind']])
+
+        if name == 'add':
+            value = dict(op.get('value', {}))
+            if field is not None and any(item[field] == value.get(field) for item in items):
+                raise ValueError(f"Duplicate {op['kind']} {value.get(field)}")
+            items.append(value)
+        elif name in ('update', 'remove'):
+            if field is None:
+                index = int(op.get('id'))
+                if not 0 <= index < len(items):
+                    raise ValueError(f"No load {index} in model")
+            else:
+                index = _find(items, field, op.get('id'))
+            if name == 'update':
+                items[index] = {**items[index], **op.get('value', {})}
+            else:
+                del items[index]
+        else:
+            raise ValueError(f"Unknown patch op: {name}")
+
+    # Elements must not reference removed nodes
+    node_ids = {n['id'] for n in model['nodes']}
+    for e in model['elements']:
+        if e['n1'] not in node_ids or e['n2'] not in node_ids:
+            raise ValueError(f"Element {e['id']} references a missing node")
+    return model
+
+
+class FrameSession:
+    def __init__(self, model):
+        self.id = uuid.uuid4().hex
+        self.model = model
+        self.version = 0
+        self.state = None # FrameSolver.solve_reusing state: base factorization etc.
+        self.lock = threading.Lock()
+
+    def solve(self, model, max_rank):
+        # Solves model reusing this session's factorization; commits the model
+        # only if the solve succeeds
+        solver = tasks.build_frame_solver(model)
+        with tasks.solve_slot():
+            result, state, info = solver.solve_reusing(
+                self.state,
+                method=model.get('method', 'auto'),
+                max_rank=max_rank,
+                member_points=int(model.get('member_points', 0))
+            )
+        self.model = model
+        self.state = state
+        self.version += 1
+        info['timings'] = solver.timings
+        return result, info
+
+    def describe(self):
+        return {'id': self.id, 'version': self.version, 'model': self.model}
+
+
+class SessionStore:
+    def __init__(self, maxsize=64, ttl=1800, max_rank=64):
+        # maxsize/ttl: sessions kept (least recently used evicted first) and idle lifetime
+        # max_rank: most DOFs a stiffness change may touch before a patch refactors
+        self.max_rank = int(max_rank)
+        self._sessions = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def create(self, model):
+        session = FrameSession(None)
+        with session.lock:
+            result, info = session.solve(apply_patch(model, []), self.max_rank)
+        self._sessions.put(session.id, session)
+        return session, result, info
+
+    def get(self, session_id):
+        # Every access restarts the session's idle lifetime
+        return self._sessions.get(session_id, touch=True)
+
+    def patch(self, session, ops):
+        with session.lock:
+            result = session.solve(apply_patch(session.model, ops), self.max_rank)
+        self._sessions.touch(session.id) # idle time counts from the end of the solve
+        return result
+
+    def delete(self, session_id):
+        return self._sessions.pop(session_id)
+
+    def stats(self):
+        return self._sessions.stats()
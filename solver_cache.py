@@ -0,0 +1,136 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import scipy.sparse as sp
+
+
+def nbytes(value):
+    # Estimated memory held by a cached value: arrays, sparse matrices and
+    # factorizations (solve functions that carry an `nbytes` attribute), summed
+    # through tuples, lists and dicts. Anything else counts as nothing.
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if sp.issparse(value):
+        value = value.tocsr() if value.format not in ('csr', 'csc') else value
+        return value.data.nbytes + value.indices.nbytes + value.indptr.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    if isinstance(value, dict):
+        return sum(nbytes(v) for v in value.values())
+    return int(getattr(value, 'nbytes', 0)) if callable(value) else 0
+
+
+class LRUCache:
+    # Process-local, thread-safe LRU cache with an entry limit, an optional byte
+    # limit (estimated with nbytes) and a time-to-live. Entries older than `ttl`
+    # seconds count as misses and are dropped on access; a value larger than
+    # max_bytes on its own is not stored.
+    def __init__(self, maxsize=32, ttl=600, max_bytes=None):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self.max_bytes = None if max_bytes is None else int(max_bytes)
+        self._entries = OrderedDict() # key -> (stored_at, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, touch=False):
+        # touch: restart the entry's time-to-live, so it expires after `ttl`
+        # seconds without use rather than `ttl` seconds after it was stored
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value, size = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if touch:
+                self._entries[key] = (time.monotonic(), value, size)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def touch(self, key):
+        # Restarts the time-to-live of an entry that has not expired yet
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._entries[key] = (time.monotonic(),) + entry[1:]
+                self._entries.move_to_end(key)
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        size = nbytes(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (time.monotonic(), value, size)
+            self._bytes += size
+            while len(self._entries) > self.maxsize or \
+                    (self.max_bytes is not None and self._bytes > self.max_bytes):
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self._bytes -= entry[2]
+            return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+def structure_key(*parts):
+    # Canonical hash of a structural description. Arrays are hashed by their bytes,
+    # everything else through sorted-key JSON, so equal models give equal keys.
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(str(part.dtype).encode())
+            h.update(str(part.shape).encode())
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(json.dumps(part, sort_keys=True, separators=(',', ':')).encode())
+        h.update(b'|')
+    return h.hexdigest()
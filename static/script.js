@@ -1,5 +1,141 @@
 let charts = {};
 
+// --- BINARY RESULT DECODING ---
+// Mirrors columnar.pack: 'SCOL', u8 version, 3 pad bytes, u32 header length,
+// JSON header, then 8-byte aligned little-endian column blocks.
+const COLUMNAR_TYPE = 'application/x-columnar';
+const COLUMNAR_ARRAYS = { float32: Float32Array, float64: Float64Array, int32: Int32Array };
+
+function decodeColumnar(buffer) {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== 'SCOL') throw new Error('Not a columnar payload');
+    const headerLength = view.getUint32(8, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 12, headerLength)));
+    const start = Math.ceil((12 + headerLength) / 8) * 8;
+    // Typed arrays read in platform byte order, which is little-endian in every browser we target
+    const columns = header.columns.map(c =>
+        Array.from(new COLUMNAR_ARRAYS[c.dtype](buffer, start + c.offset, c.length)));
+
+    const revive = node => {
+        if (Array.isArray(node)) return node.map(revive);
+        if (node === null || typeof node !== 'object') return node;
+        if ('$col' in node) return columns[node.$col];
+        if ('$table' in node) {
+            const table = {};
+            for (const [k, v] of Object.entries(node.$table.columns)) table[k] = revive(v);
+            return Array.from({ length: node.$table.length }, (_, i) => {
+                const row = {};
+                for (const k in table) row[k] = table[k][i];
+                return row;
+            });
+        }
+        const out = {};
+        for (const [k, v] of Object.entries(node)) out[k] = revive(v);
+        return out;
+    };
+    return revive(header.doc);
+}
+
+// The last few results per URL with their ETags. They are offered in
+// If-None-Match, and a 304 names the one that answers the request, so switching
+// back to an earlier model skips both the solve and the download.
+const RECENT_RESULTS = 8;
+const recentResults = {};
+
+async function postSolve(url, payload, accept = `${COLUMNAR_TYPE}, application/json;q=0.9`) {
+    // Asks for the binary format by default, falls back to JSON (errors are always JSON)
+    const recent = recentResults[url] || (recentResults[url] = []);
+    const headers = { 'Content-Type': 'application/json', 'Accept': accept };
+    if (recent.length) headers['If-None-Match'] = recent.map(r => r.etag).join(', ');
+    const response = await fetch(url, { method: 'POST', headers, body: JSON.stringify(payload) });
+    const etag = response.headers.get('ETag');
+    if (response.status === 304) {
+        const hit = recent.find(r => r.etag === etag);
+        if (hit) return hit.result;
+        recent.length = 0; // should not happen; ask again unconditionally
+        return postSolve(url, payload, accept);
+    }
+
+    const result = (response.headers.get('Content-Type') || '').startsWith(COLUMNAR_TYPE)
+        ? decodeColumnar(await response.arrayBuffer())
+        : await response.json();
+    if (etag && result.status === 'success') {
+        const others = recent.filter(r => r.etag !== etag);
+        recent.splice(0, recent.length, { etag, result }, ...others.slice(0, RECENT_RESULTS - 1));
+    }
+    return result;
+}
+
+// --- LIVE RECALCULATION ---
+// One Server-Sent Events stream carries the results of all tabs (see live.py);
+// edits are posted to it with a per-tab sequence number. The server drops edits
+// that a newer one has superseded and sends a coarse result before the full one,
+// so the debounce can be short. Without the stream, edits fall back to plain
+// POSTs. Either way only the newest edit's result is shown.
+const LIVE_DEBOUNCE = 60;
+const POST_DEBOUNCE = 300;
+const live = {
+    source: null,
+    channel: null,
+    reconnecting: false,
+    seq: { beam: 0, pillar: 0, frame: 0 },
+    latest: {}, // kind -> last payload sent
+    show: { beam: showBeamResult, pillar: showPillarResult, frame: showFrameResult }
+};
+
+function openLive() {
+    if (!window.EventSource) return;
+    live.source = new EventSource('/live');
+    live.source.addEventListener('channel', e => {
+        live.channel = JSON.parse(e.data).id;
+        // A new channel after a reconnect has none of our edits: resend each tab's latest
+        if (live.reconnecting) Object.keys(live.latest).forEach(kind => sendLive(kind, live.latest[kind]));
+        live.reconnecting = false;
+    });
+    live.source.addEventListener('result', e => {
+        const message = JSON.parse(e.data);
+        if (message.seq === live.seq[message.kind]) live.show[message.kind](message);
+    });
+    // EventSource reconnects by itself; until then edits are POSTed directly
+    live.source.onerror = () => {
+        live.channel = null;
+        live.reconnecting = true;
+    };
+}
+
+function sendLive(kind, payload) {
+    const seq = ++live.seq[kind];
+    live.latest[kind] = payload;
+    fetch(`/live/${live.channel}`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ kind, seq, payload })
+    }).then(response => {
+        if (response.status === 404) live.channel = null; // channel closed on the server
+    }).catch(e => console.error(e));
+}
+
+async function requestSolve(kind, payload, post) {
+    // post(payload) -> {status, data} is the fallback without a live channel
+    if (live.channel) {
+        sendLive(kind, payload);
+        return;
+    }
+    const seq = ++live.seq[kind];
+    live.latest[kind] = payload;
+    try {
+        const result = await post(payload);
+        if (seq === live.seq[kind]) live.show[kind](result); // responses can arrive out of order
+    } catch (e) {
+        console.error(e);
+    }
+}
+
+function debounceDelay() {
+    return live.channel ? LIVE_DEBOUNCE : POST_DEBOUNCE;
+}
+
 // --- MAIN TAB SWITCHING ---
 function switchTab(tabId) {
     // Hide all workspaces
@@ -47,19 +183,19 @@ let frameCalcTimeout = null;
 function debounceBeamCalc() {
     drawBeam();
     clearTimeout(beamCalcTimeout);
-    beamCalcTimeout = setTimeout(calculate, 300);
+    beamCalcTimeout = setTimeout(calculate, debounceDelay());
 }
 
 function debouncePillarCalc() {
     drawPillar();
     clearTimeout(pillarCalcTimeout);
-    pillarCalcTimeout = setTimeout(calculatePillar, 300);
+    pillarCalcTimeout = setTimeout(calculatePillar, debounceDelay());
 }
 
 function debounceFrameCalc() {
     drawFrame();
     clearTimeout(frameCalcTimeout);
-    frameCalcTimeout = setTimeout(calculateFrame, 300);
+    frameCalcTimeout = setTimeout(calculateFrame, debounceDelay());
 }
 
 function addSupport() {
@@ -108,6 +244,8 @@ function addDistLoad() {
 }
 
 function init() {
+    openLive();
+
     // Beam Init
     addSupport(); 
     const s1 = document.querySelector('#supportsList .item-row:last-child');
@@ -205,23 +343,14 @@ async function calculate() {
     });
 
     const payload = { length, E, I, supports, loads, dist_loads: distLoads };
+    await requestSolve('beam', payload, p => postSolve('/calculate', p));
+}
 
-    try {
-        const response = await fetch('/calculate', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(payload)
-        });
-        
-        const result = await response.json();
-        
-        if (result.status === 'success') {
-            displayReactions(result.data.reactions);
-            renderCharts(result.data);
-            drawBeam(); 
-        }
-    } catch (e) {
-        console.error(e);
+function showBeamResult(result) {
+    if (result.status === 'success') {
+        displayReactions(result.data.reactions);
+        renderCharts(result.data);
+        drawBeam(); 
     }
 }
 
@@ -448,8 +577,6 @@ function drawBeam() {
 
 // === PILLAR LOGIC ===
 async function calculatePillar() {
-    const appliedP = parseFloat(document.getElementById('pillarP').value) * 1000; // Convert kN to N
-    
     const payload = {
         length: parseFloat(document.getElementById('pillarL').value),
         E: parseFloat(document.getElementById('pillarE').value) * 1e9, // Convert GPa to Pa
@@ -458,41 +585,36 @@ async function calculatePillar() {
         k_type: document.getElementById('pillarK').value
     };
 
-    try {
-        const response = await fetch('/calculate_pillar', {
-            method: 'POST',
-            headers: {'Content-Type': 'application/json'},
-            body: JSON.stringify(payload)
-        });
-        const result = await response.json();
-        if (result.status === 'success') {
-            const d = result.data;
-            const Pcr = d.P_cr;
-            const SF = Pcr / appliedP;
-            
-            // Format Pcr nicely
-            let pcrText = Pcr >= 1e6 ? (Pcr / 1e6).toFixed(2) + ' MN' : 
-                          Pcr >= 1e3 ? (Pcr / 1e3).toFixed(2) + ' kN' : 
-                          Pcr.toFixed(2) + ' N';
-            
-            document.getElementById('resPcr').innerText = pcrText;
-            document.getElementById('resP').innerText = (appliedP / 1000).toFixed(1) + ' kN';
-            
-            // Color code safety factor
-            const sfEl = document.getElementById('resSF');
-            sfEl.innerText = SF.toFixed(2);
-            sfEl.style.color = SF >= 3 ? '#10b981' : SF >= 1.5 ? '#f59e0b' : '#ef4444';
-            
-            // Format sigma nicely
-            let sigmaText = d.sigma_cr >= 1e6 ? (d.sigma_cr / 1e6).toFixed(2) + ' MPa' : 
-                            d.sigma_cr >= 1e3 ? (d.sigma_cr / 1e3).toFixed(2) + ' kPa' : 
-                            d.sigma_cr.toFixed(2) + ' Pa';
-            document.getElementById('resSigma').innerText = sigmaText;
-            document.getElementById('resLambda').innerText = d.slenderness.toFixed(2);
-            drawPillar(d.K);
-        }
-    } catch (e) {
-        console.error(e);
+    await requestSolve('pillar', payload, p => postSolve('/calculate_pillar', p, 'application/json'));
+}
+
+function showPillarResult(result) {
+    const appliedP = parseFloat(document.getElementById('pillarP').value) * 1000; // Convert kN to N
+    if (result.status === 'success') {
+        const d = result.data;
+        const Pcr = d.P_cr;
+        const SF = Pcr / appliedP;
+        
+        // Format Pcr nicely
+        let pcrText = Pcr >= 1e6 ? (Pcr / 1e6).toFixed(2) + ' MN' : 
+                      Pcr >= 1e3 ? (Pcr / 1e3).toFixed(2) + ' kN' : 
+                      Pcr.toFixed(2) + ' N';
+        
+        document.getElementById('resPcr').innerText = pcrText;
+        document.getElementById('resP').innerText = (appliedP / 1000).toFixed(1) + ' kN';
+        
+        // Color code safety factor
+        const sfEl = document.getElementById('resSF');
+        sfEl.innerText = SF.toFixed(2);
+        sfEl.style.color = SF >= 3 ? '#10b981' : SF >= 1.5 ? '#f59e0b' : '#ef4444';
+        
+        // Format sigma nicely
+        let sigmaText = d.sigma_cr >= 1e6 ? (d.sigma_cr / 1e6).toFixed(2) + ' MPa' : 
+                        d.sigma_cr >= 1e3 ? (d.sigma_cr / 1e3).toFixed(2) + ' kPa' : 
+                        d.sigma_cr.toFixed(2) + ' Pa';
+        document.getElementById('resSigma').innerText = sigmaText;
+        document.getElementById('resLambda').innerText = d.slenderness.toFixed(2);
+        drawPillar(d.K);
     }
 }
 
@@ -688,20 +810,14 @@ async function calculateFrame() {
         loads: loadsInN
     };
     
-    try {
-        const response = await fetch('/calculate_frame', {
-            method: 'POST',
-            headers: {'Content-Type': 'application/json'},
-            body: JSON.stringify(payload)
-        });
-        const result = await response.json();
-        if (result.status === 'success') {
-            frameResults = result.data;
-            drawFrame(true);
-            displayFrameResults(frameResults);
-        }
-    } catch (e) {
-        console.error(e);
+    await requestSolve('frame', payload, p => postSolve('/calculate_frame', p));
+}
+
+function showFrameResult(result) {
+    if (result.status === 'success') {
+        frameResults = result.data;
+        drawFrame(true);
+        displayFrameResults(frameResults);
     }
 }
 
@@ -0,0 +1,211 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from beam_solver import BeamSolver
+from pillar_solver import PillarSolver
+from frame_solver import FrameSolver
+from metrics import check_deadline
+
+# Request payload -> solver -> result. Shared by the Flask handlers and the
+# background job workers so both paths produce identical results.
+
+# Solves that may run at once in this process. A server worker serves many
+# connections in threads (open /live streams, slow clients), but a solve already
+# keeps BLAS_THREADS cores busy, so further solves wait for a slot instead of
+# oversubscribing the CPU.
+SOLVE_CONCURRENCY = max(1, int(os.environ.get('SOLVE_CONCURRENCY', 1)))
+_solve_slots = threading.BoundedSemaphore(SOLVE_CONCURRENCY)
+
+@contextmanager
+def solve_slot():
+    # Holds one of the process's solve slots; the wait counts toward the
+    # request's deadline (metrics.set_deadline)
+    while not _solve_slots.acquire(timeout=0.1):
+        check_deadline()
+    try:
+        yield
+    finally:
+        _solve_slots.release()
+
+def _limited(solve):
+    # Runs a solve_* function in a solve slot; the wait is reported as the 'queue' phase
+    @functools.wraps(solve)
+    def limited(data, cache=None, stats=None):
+        start = time.perf_counter()
+        with solve_slot():
+            if stats is not None:
+                stats.setdefault('timings', {})['queue'] = time.perf_counter() - start
+            return solve(data, cache, stats)
+    return limited
+
+def build_beam_solver(data, cache=None):
+    length = float(data.get('length', 10))
+    E = float(data.get('E', 200e9)) # 200 GPa default
+    I = float(data.get('I', 0.0001)) # Default I
+
+    # supports, loads and dist_loads: lists of records or mappings of columns
+    return BeamSolver.from_arrays(
+        length, E, I,
+        supports=data.get('supports', []),
+        loads=data.get('loads', []),
+        dist_loads=data.get('dist_loads', []),
+        cache=cache
+    )
+
+def build_frame_solver(data, cache=None):
+    # Each section is a list of records or, for large models, a mapping of
+    # equal-length columns: {'nodes': {'id': [...], 'x': [...], 'y': [...]}, ...}
+    return FrameSolver.from_arrays(
+        data.get('nodes', []),
+        data.get('elements', []),
+        data.get('supports', []),
+        data.get('loads', []),
+        cache=cache
+    )
+
+def build_pillar_solver(data):
+    return PillarSolver(
+        length=data.get('length'),
+        E=data.get('E'),
+        I=data.get('I'),
+        A=data.get('A'),
+        k_factor_type=data.get('k_type')
+    )
+
+def _report(solver, stats):
+    # Copies the solver's phase timings and model sizes into stats, when requested
+    if stats is not None:
+        stats.setdefault('timings', {}).update(solver.timings)
+        stats.setdefault('sizes', {}).update(solver.sizes)
+
+@_limited
+def solve_beam(data, cache=None, stats=None):
+    solver = build_beam_solver(data, cache)
+    result = solver.solve(num_points=data.get('num_points', 500), output=data.get('output', 'sampled'))
+    _report(solver, stats)
+    return result
+
+@_limited
+def solve_beam_batch(data, cache=None, stats=None):
+    solver = build_beam_solver(data, cache)
+    result = solver.solve_cases(data.get('load_cases', []), data.get('combinations', []),
+                                num_points=data.get('num_points', 500))
+    _report(solver, stats)
+    return result
+
+@_limited
+def solve_influence(data, cache=None, stats=None):
+    solver = build_beam_solver(data, cache)
+    result = solver.moving_load(data.get('axles', []),
+                                num_positions=data.get('num_positions', 2000),
+                                num_sections=data.get('num_sections', 201))
+    _report(solver, stats)
+    return result
+
+@_limited
+def solve_pillar(data, cache=None, stats=None):
+    return build_pillar_solver(data).solve()
+
+@_limited
+def solve_pillar_sweep(data, cache=None, stats=None):
+    return PillarSolver.sweep(
+        length=data.get('length'),
+        E=data.get('E'),
+        I=data.get('I'),
+        A=data.get('A'),
+        k_factor_type=data.get('k_type'),
+        dtype=data.get('dtype', 'float64')
+    )
+
+@_limited
+def solve_frame(data, cache=None, stats=None):
+    solver = build_frame_solver(data, cache)
+    result = solver.solve(method=data.get('method', 'auto'),
+                          member_points=int(data.get('member_points', 0)))
+    _report(solver, stats)
+    return result
+
+@_limited
+def solve_frame_batch(data, cache=None, stats=None):
+    solver = build_frame_solver(data, cache)
+    result = solver.solve_cases(data.get('load_cases', []), data.get('combinations', []),
+                                method=data.get('method', 'auto'),
+                                member_points=int(data.get('member_points', 0)))
+    _report(solver, stats)
+    return result
+
+@_limited
+def solve_modal(data, cache=None, stats=None):
+    solver = build_frame_solver(data, cache)
+    result = solver.modal(num_modes=int(data.get('num_modes', 6)),
+                          mass=data.get('mass', 'consistent'),
+                          rho=float(data.get('rho', 7850.0)),
+                          method=data.get('method', 'auto'),
+                          max_nodes=int(data.get('max_nodes', 2000)))
+    _report(solver, stats)
+    return result
+
+@_limited
+def solve_buckling(data, cache=None, stats=None):
+    solver = build_frame_solver(data, cache)
+    result = solver.buckling(num_modes=int(data.get('num_modes', 4)),
+                             method=data.get('method', 'auto'),
+                             max_nodes=int(data.get('max_nodes', 2000)))
+    _report(solver, stats)
+    return result
+
+@_limited
+def solve_p_delta(data, cache=None, stats=None):
+    solver = build_frame_solver(data, cache)
+    result = solver.p_delta(tol=float(data.get('tol', 1e-6)),
+                            max_iter=int(data.get('max_iter', 30)),
+                            method=data.get('method', 'auto'),
+                            member_points=int(data.get('member_points', 0)))
+    _report(solver, stats)
+    return result
+
+TASKS = {
+    'beam': solve_beam,
+    'beam_batch': solve_beam_batch,
+    'influence': solve_influence,
+    'pillar': solve_pillar,
+    'pillar_sweep': solve_pillar_sweep,
+    'frame': solve_frame,
+    'frame_batch': solve_frame_batch,
+    'modal': solve_modal,
+    'buckling': solve_buckling,
+    'p_delta': solve_p_delta
+}
+
+def run_task(kind, data, cache=None, stats=None):
+    if kind not in TASKS:
+        raise ValueError(f"Unknown task kind: {kind}")
+    return TASKS[kind](data, cache, stats)
+
+def _rows(section):
+    # Number of items in a payload section: a list of records or a mapping of columns
+    if isinstance(section, dict):
+        return len(next(iter(section.values()), []))
+    return len(section)
+
+def task_size(kind, data):
+    # Rough work estimate in degrees of freedom times right-hand sides, used to
+    # decide whether a job is worth sending to a background worker
+    if kind.startswith('beam') or kind == 'influence':
+        points = 2 + _rows(data.get('supports', [])) + _rows(data.get('loads', [])) + 2 * _rows(data.get('dist_loads', []))
+        for case in data.get('load_cases', []):
+            points += _rows(case.get('loads', [])) + 2 * _rows(case.get('dist_loads', []))
+        size = 2 * points * max(1, len(data.get('load_cases', [])))
+        if kind == 'influence':
+            size *= max(1, len(data.get('axles', []))) * int(data.get('num_positions', 2000)) // 100
+        return size
+    if kind.startswith('frame') or kind == 'p_delta':
+        return 3 * _rows(data.get('nodes', [])) * max(1, len(data.get('load_cases', [])))
+    if kind in ('modal', 'buckling'):
+        return 3 * _rows(data.get('nodes', [])) * max(1, int(data.get('num_modes', 6)))
+    if kind == 'pillar_sweep':
+        return 1000 # broadcast evaluation, cheap unless the grid is huge
+    return 1